@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+import ingest
+
+
+# z value of the analytic 95% confidence interval of a group mean
+Z_95 = 1.96
+# Tukey whisker length in IQRs
+WHISKER = 1.5
+
+# Summary tables are tiny compared with the data they describe, so a small budget holds many
+summary_cache = ingest.DataFrameCache(64 * 1024 * 1024)
+
+
+# Per-group statistics of `value` grouped by `by`: count, mean, std, min/max, quartiles,
+# an analytic 95% CI of the mean, Tukey whisker ends and the number of points beyond them.
+# One row per group; this is all a bar chart or boxplot needs to be drawn.
+def group_stats(df, by, value, whisker=WHISKER):
+    # Factorize once so every aggregation below groups on compact integer codes
+    codes, groups = pd.factorize(df[by], sort=True)
+    present = codes >= 0
+    codes = codes[present]
+    values = df[value].to_numpy(dtype=np.float64, na_value=np.nan)[present]
+
+    grouped = pd.Series(values).groupby(codes, sort=True)
+    summary = grouped.agg(["count", "mean", "std", "min", "max"])
+    quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    quartiles.columns = ["q1", "median", "q3"]
+    summary = summary.join(quartiles)
+
+    half_width = Z_95 * summary["std"] / np.sqrt(summary["count"])
+    summary["ci_low"] = summary["mean"] - half_width
+    summary["ci_high"] = summary["mean"] + half_width
+
+    # Whiskers reach the most extreme values still within whisker * IQR of the quartiles
+    iqr = summary["q3"] - summary["q1"]
+    low = (summary["q1"] - whisker * iqr).to_numpy()[codes]
+    high = (summary["q3"] + whisker * iqr).to_numpy()[codes]
+    inside = (values >= low) & (values <= high)
+    ends = pd.Series(values[inside]).groupby(codes[inside]).agg(["min", "max"])
+    summary["whisker_low"] = ends["min"]
+    summary["whisker_high"] = ends["max"]
+    summary["outliers"] = summary["count"] - np.bincount(codes[inside], minlength=len(groups))
+
+    summary.index = pd.Index(groups, name=by)
+    return summary
+
+
+# group_stats served from the summary cache, keyed by the dataset fingerprint and columns
+def cached_group_stats(df, fingerprint, by, value):
+    key = (fingerprint, by, value)
+    summary = summary_cache.get(key)
+    if summary is None:
+        summary = group_stats(df, by, value)
+        summary_cache.put(key, summary)
+    return summary
@@ -1,13 +1,31 @@
 import streamlit as st
-import matplotlib.pyplot as plt 
-import pandas as pd
-import numpy as np
-import seaborn as sns
-import sqlite3
+import os
 import re
+import time
 from streamlit_option_menu import option_menu
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import LabelEncoder  
+import instrument
+import jobs
+import reviews
+from lazy import LazyModule
+
+# Imported on first use, so the Home, Contact and Review pages start without loading
+# matplotlib, seaborn or scipy (check with `python importtime.py --forbid`)
+pd = LazyModule("pandas")
+sns = LazyModule("seaborn")
+aggregate = LazyModule("aggregate")
+charts = LazyModule("charts")
+dedup = LazyModule("dedup")
+encoding = LazyModule("encoding")
+export = LazyModule("export")
+figures = LazyModule("figures")
+imputation = LazyModule("imputation")
+ingest = LazyModule("ingest")
+outliers = LazyModule("outliers")
+pipeline = LazyModule("pipeline")
+preview = LazyModule("preview")
+profiling = LazyModule("profiling")
+query = LazyModule("query")
+store = LazyModule("store")
 
 
 st.set_page_config(
@@ -62,149 +80,509 @@ def home_page():
 
 
 
+# Loader options shown above each uploader; returns keyword arguments for ingest.load_file
+def loader_options(key):
+    with st.expander("Loading options"):
+        optimize = st.checkbox("Memory-optimized loading (chunked, compact dtypes)", key=f"{key}_optimize")
+        use_pyarrow = st.checkbox("Use the pyarrow engine", key=f"{key}_pyarrow", disabled=not optimize)
+        string_dtype = st.checkbox("Store text columns as string dtype", key=f"{key}_string", disabled=not optimize)
+    return {"optimize": optimize, "engine": "pyarrow" if use_pyarrow else "c", "string_dtype": string_dtype}
+
+
+# Show how often uploads were served from the parsed-DataFrame cache, how long the file took
+# to parse, and the memory saved when the dataset went through the optimizing loader
+def show_cache_stats(fingerprint=None):
+    stats = ingest.default_cache.stats()
+    st.caption(
+        f"Upload cache: {stats['entries']} file(s), {stats['bytes'] / 1024 ** 2:.1f} MB used, "
+        f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions"
+    )
+    report = ingest.load_report(fingerprint) if fingerprint else None
+    if report and "parse_seconds" in report:
+        st.caption(
+            f"Parsed {report['rows']:,} rows from {report['file_bytes'] / 1024 ** 2:.1f} MB of "
+            f"{report['format']} in {report['parse_seconds']:.2f}s"
+        )
+    if report and "bytes_before" in report:
+        st.caption(
+            f"Memory footprint: {report['bytes_before'] / 1024 ** 2:.1f} MB with default dtypes, "
+            f"{report['bytes_after'] / 1024 ** 2:.1f} MB optimized ({report['engine']} engine)"
+        )
+
+
+# Run heavy work as a background job and wait for it with a progress bar and a Cancel button.
+# A rerun (e.g. after another widget changed) submits the same key again and re-attaches to
+# the job in flight instead of restarting it. Returns the job's result or raises its error.
+# A cancelled job is dropped from the scheduler; this session remembers the cancellation
+# and offers Restart instead of starting it again on the next rerun.
+def run_job(key, label, fn, *args, **kwargs):
+    widget_key = f"job_{ingest.file_fingerprint(repr(key).encode())}"
+    cancelled = st.session_state.setdefault("cancelled_jobs", set())
+    if widget_key in cancelled:
+        st.warning(f"{label} was cancelled.")
+        if st.button("Restart", key=f"restart_{widget_key}"):
+            cancelled.discard(widget_key)
+            st.rerun()
+        st.stop()
+
+    with instrument.span(str(key[0]), label=label) as span:
+        frame = next((arg for arg in args if isinstance(arg, pd.DataFrame)), None)
+        if frame is not None:
+            span.frame(frame)
+        job = jobs.default_scheduler.submit(key, fn, *args, label=label, **kwargs)
+        span.set(reused=job.done())
+        if not job.done() and not job.cancelled():
+            cancel_slot = st.empty()
+            if cancel_slot.button(f"Cancel: {label}", key=f"cancel_{widget_key}"):
+                jobs.default_scheduler.forget(key)
+            bar = st.progress(job.progress, text=label)
+            while not job.done() and not job.cancelled():
+                text = f"{label}: {job.message}" if job.message else label
+                bar.progress(job.progress, text=f"{text} ({job.elapsed():.0f}s)")
+                time.sleep(0.1)
+            bar.empty()
+            cancel_slot.empty()
+    if job.cancelled():
+        cancelled.add(widget_key)
+        st.rerun()
+    return job.result()
+
+
+# Cleaning step run as a job keyed by its output fingerprint
+def run_step(step, df, fingerprint, profile=None):
+    key = ("step", pipeline.step_fingerprint(fingerprint, step))
+    return run_job(key, f"Running {step.name.replace('_', ' ')}", pipeline.run_step, step, df, fingerprint, profile=profile)
+
+
+def get_profile(df, fingerprint):
+    return run_job(("profile", fingerprint), "Profiling the dataset", profiling.get_profile, df, fingerprint)
+
+
+def render_figure(key, draw, figsize=None):
+    return run_job(("render",) + tuple(key), "Drawing the chart", figures.render, key, draw, figsize)
+
+
+def group_stats(df, fingerprint, by, value):
+    return run_job(("group_stats", fingerprint, by, value), "Summarizing groups", aggregate.cached_group_stats,
+                   df, fingerprint, by, value)
+
+
+# Disk usage of the shared dataset store
+def show_store_stats():
+    stats = store.default_store.stats()
+    st.caption(
+        f"Dataset store: {stats['versions']} saved version(s), "
+        f"{stats['bytes'] / 1024 ** 2:.1f} of {stats['max_bytes'] / 1024 ** 2:.0f} MB used"
+    )
+
+
+# Dataset for a section: a new CSV upload or a version saved in the dataset store.
+# Returns the DataFrame, its fingerprint and a display name, or (None, None, None) until one is chosen.
+def choose_dataset(key, label):
+    versions = store.default_store.versions()
+    if versions and st.radio("Dataset source:", ("Upload a CSV file", "Saved version"), key=f"{key}_source", horizontal=True) == "Saved version":
+        details = {v["name"]: f"{v['name']} ({v['kind']}, {v['rows']:,} rows x {v['columns']} columns)" for v in versions}
+        name = st.selectbox("Open a saved version:", list(details), format_func=details.get, key=f"{key}_version")
+        try:
+            with instrument.span("open_version", version=name) as span:
+                df, fingerprint = store.default_store.open(name)
+                span.frame(df)
+        except KeyError as e:
+            st.error(str(e))
+            return None, None, None
+        show_store_stats()
+        return df, fingerprint, name
+
+    load_kwargs = loader_options(key)
+    uploaded_file = st.file_uploader(label, type=ingest.UPLOAD_TYPES)
+    if uploaded_file is None:
+        return None, None, None
+    if uploaded_file.size == 0:
+        st.error("Uploaded file is empty.")
+        return None, None, None
+    try:
+        with instrument.span("load_file", file=uploaded_file.name, file_bytes=uploaded_file.size) as span:
+            # Only the chosen columns are read; Parquet and Feather skip the others on disk
+            columns = st.multiselect("Columns to load (leave empty to load all):", ingest.list_columns(uploaded_file),
+                                     key=f"{key}_columns")
+            # Parsed once per file and column selection, then served from the cache
+            df, fingerprint = ingest.load_file(uploaded_file, columns=columns, **load_kwargs)
+            span.frame(df)
+    except pd.errors.ParserError:
+        st.error("Uploaded file is not a valid CSV.")
+        return None, None, None
+    except (ValueError, OSError) as e:
+        st.error(f"Could not read the uploaded file: {e}")
+        return None, None, None
+    show_cache_stats(fingerprint)
+    return df, fingerprint, uploaded_file.name
+
+
+# Save a dataset as a named version that every section can open without re-uploading
+def save_version(df, key, source, kind):
+    with st.expander(f"Save the {kind} dataset for the other sections"):
+        default_name = f"{ingest.file_stem(source)} ({kind})"
+        name = st.text_input("Version name:", value=default_name, key=f"{key}_name").strip()
+        if st.button("Save version", key=f"{key}_save"):
+            if not name:
+                st.error("Please enter a name for this version.")
+            else:
+                try:
+                    with instrument.span("save_version", kind=kind) as span:
+                        span.frame(df)
+                        entry = store.default_store.save(name, df, kind, source)
+                    st.success(f"Saved '{name}' ({entry['bytes'] / 1024 ** 2:.1f} MB on disk).")
+                except (ValueError, TypeError) as e:
+                    st.error(f"Could not save this version: {e}")
+        show_store_stats()
+
+
+# Download a dataset as CSV (plain, gzip or zstd), Parquet or Feather. The file is serialized
+# when requested and kept for this dataset version, with the time serialization took.
+def offer_download(df, version, key, source):
+    with st.expander("Download this dataset"):
+        fmt = st.selectbox("File format:", list(export.FORMATS), key=f"{key}_format")
+        if st.button("Prepare download", key=f"{key}_prepare"):
+            with instrument.span("export", format=fmt) as span:
+                span.frame(df)
+                data, seconds = export.to_bytes(df, fmt)
+                span.set(file_bytes=len(data))
+            st.session_state[f"{key}_export"] = (version, fmt, data, seconds)
+        prepared = st.session_state.get(f"{key}_export")
+        if prepared is not None and prepared[:2] == (version, fmt):
+            _, _, data, seconds = prepared
+            st.caption(f"Serialized {len(df):,} rows to {fmt} in {seconds:.2f}s ({len(data) / 1024 ** 2:.1f} MB)")
+            st.download_button(f"Download {fmt}", data, file_name=f"{ingest.file_stem(source)}.{fmt}",
+                               mime=export.FORMATS[fmt], key=f"{key}_download")
+
+
+# Boxplot of one column for the outlier step, served from the figure cache
+def show_outlier_boxplot(df, fingerprint, column, title):
+    def draw(ax):
+        sns.boxplot(x=df[column], ax=ax)
+        ax.set_title(title)
+
+    png, _ = render_figure((fingerprint, "outlier_boxplot", column, title), draw, figsize=(8, 5))
+    st.image(png)
+
+
+# Batch imputation settings: a default strategy per dtype plus per-column overrides edited in
+# one table. Returns the fitted fill values, or None when an override is invalid.
+def choose_fill_values(df, profile, missing_cols):
+    numeric_default = st.selectbox("Default for numeric columns:", imputation.NUMERIC_STRATEGIES)
+    categorical_default = st.selectbox("Default for other columns:", imputation.CATEGORICAL_STRATEGIES)
+    settings = pd.DataFrame({
+        "column": missing_cols,
+        "dtype": profile.columns.loc[missing_cols, "dtype"].tolist(),
+        "missing": profile.null_counts().loc[missing_cols].tolist(),
+        "strategy": "default",
+        "constant": "",
+    })
+    strategies = ["default", *dict.fromkeys(imputation.NUMERIC_STRATEGIES + imputation.CATEGORICAL_STRATEGIES), "constant"]
+    edited = st.data_editor(
+        settings,
+        column_config={"strategy": st.column_config.SelectboxColumn("strategy", options=strategies, required=True)},
+        disabled=["column", "dtype", "missing"],
+        hide_index=True,
+        key="imputation_overrides",
+    )
+
+    overrides, constants = {}, {}
+    for row in edited.itertuples(index=False):
+        if row.strategy == "constant":
+            constant = row.constant
+            if profile.columns.at[row.column, "numeric"]:
+                constant = pd.to_numeric(constant, errors="coerce")
+                if pd.isna(constant):
+                    st.error(f"Enter a numeric constant for '{row.column}'.")
+                    return None
+            constants[row.column] = constant
+        elif row.strategy != "default":
+            overrides[row.column] = row.strategy
+
+    try:
+        values = imputation.fit(df, numeric_default, categorical_default, overrides, constants, profile=profile)
+    except ValueError as e:
+        st.error(str(e))
+        return None
+    st.write("Fitted fill values:")
+    st.dataframe(pd.DataFrame({"value": pd.Series(values, dtype=object).astype(str)}))
+    return values
+
+
+# Admin-only view of recent reruns: where each spent its time, per-span totals across reruns,
+# allocation tracing and a cProfile capture of this session's next rerun
+def show_performance_panel():
+    st.subheader("Performance")
+    tracing = st.checkbox("Trace memory allocations (slows the app down)", value=instrument.tracing_memory(),
+                          key="performance_trace_memory")
+    if tracing != instrument.tracing_memory():
+        instrument.trace_memory(tracing)
+    if st.button("Profile my next rerun", key="performance_profile_next"):
+        st.session_state.profile_next_rerun = True
+    if st.session_state.get("profile_next_rerun"):
+        st.caption("Your next rerun (on any page) will run under cProfile.")
+
+    runs = instrument.recent_runs()
+    if not runs:
+        st.info("No reruns recorded yet.")
+        return
+    st.write("Recent reruns, newest first:")
+    st.dataframe(pd.DataFrame([
+        {
+            "run": run.id,
+            "page": run.page,
+            "status": run.status,
+            "seconds": run.seconds,
+            "spans": len(run.spans),
+            "slowest span": max(run.spans, key=lambda span: span.seconds or 0).name if run.spans else None,
+            **run.fields,
+        }
+        for run in runs
+    ]))
+    st.write("Time by span over these reruns:")
+    st.dataframe(pd.DataFrame(instrument.span_summary(runs)))
+
+    run_id = st.selectbox("Spans of rerun:", [run.id for run in runs], key="performance_run")
+    run = next(run for run in runs if run.id == run_id)
+    st.dataframe(pd.DataFrame([span.to_dict(run.started) for span in run.spans]))
+
+    profiled = next((run for run in runs if run.profile_text), None)
+    if profiled is not None:
+        with st.expander(f"cProfile of rerun {profiled.id} ({profiled.page})"):
+            st.code(profiled.profile_text)
+            st.download_button("Download profile", profiled.profile_text, file_name=f"rerun_{profiled.id}_profile.txt",
+                               mime="text/plain", key="performance_profile_download")
+    if instrument.LOG_PATH:
+        st.caption(f"Every rerun is also logged as one JSON line to {instrument.LOG_PATH}.")
+
+
 # User Define Function For Data Cleaning
 def data_cleaning():
     # Section selection
     section = st.radio("Select a Section", ("Data Cleaning", "Encoding and Decoding"))
+    instrument.annotate(section=section)
 
     if section == "Data Cleaning":
         st.write("### Welcome to the Data Cleaning Section!")
         st.write("Upload your dataset and clean it effortlessly.")
 
-        # File Upload
-        uploaded_file = st.file_uploader("Upload a CSV file for cleaning:", type=["csv"])
-
-        if uploaded_file is not None:
-            if uploaded_file.size == 0:
-                st.error("Uploaded file is empty.")
-            else:
-                # Load the dataset
-                df = pd.read_csv(uploaded_file)
-                st.success("Dataset Preview:")
-                st.dataframe(df)
-
-                st.warning(f"Shape of the Dataset: {df.shape}")
-                st.write("Missing values in the dataset:")
-                st.write(df.isnull().sum())
-
-                # 1️⃣ **Delete Specific Columns**
-                delete_column = st.radio("Do you want to delete specific columns?", ("Yes", "No"))
-                if delete_column == "Yes":
-                    columns_to_delete = st.multiselect("Select columns to delete:", df.columns)
-                    if columns_to_delete:
-                        df = df.drop(columns=columns_to_delete)
-                        st.success(f"Deleted columns: {', '.join(columns_to_delete)}")
-                        st.write("Updated Dataset:")
-                        st.dataframe(df)
-                    else:
-                        st.warning("No columns selected for deletion.")
-
-                # 2️⃣ **Remove Missing Values**
-                remove_missing = st.radio("Do you want to remove rows with missing values?", ("Yes", "No"))
-                if remove_missing == "Yes":
-                    df = df.dropna()
-                    st.success("Missing values removed!")
-                    st.write("Updated Dataset:")
-                    st.dataframe(df)
-
-                # 3️⃣ **Fill Missing Values**
-                else:  # Only offer filling missing values if user didn't delete them
-                    fill_missing = st.radio("Do you want to fill missing values instead?", ("Yes", "No"))
-                    if fill_missing == "Yes":
-                        missing_cols = df.columns[df.isnull().any()].tolist()
-
-                        if missing_cols:
+        # Upload a file or open a saved version
+        df, fingerprint, dataset_name = choose_dataset("cleaning", "Upload a CSV, Parquet or Feather file for cleaning:")
+
+        if df is not None:
+            st.success("Dataset Preview:")
+            preview.show_page(df, "cleaning_preview")
+
+            st.warning(f"Shape of the Dataset: {df.shape}")
+            # Per-column statistics computed once and cached per dataset fingerprint
+            profile = get_profile(df, fingerprint)
+            st.write("Missing values in the dataset:")
+            st.write(profile.null_counts())
+            with st.expander("Column profile"):
+                st.dataframe(profile.columns.astype(str))
+
+            # Every applied step is recorded in the plan; step outputs are cached,
+            # so a rerun only recomputes the steps whose input or parameters changed
+            plan = pipeline.CleaningPlan()
+            raw_df, raw_fingerprint = df, fingerprint
+
+            # 1️⃣ **Delete Specific Columns**
+            delete_column = st.radio("Do you want to delete specific columns?", ("Yes", "No"))
+            if delete_column == "Yes":
+                columns_to_delete = st.multiselect("Select columns to delete:", df.columns)
+                if columns_to_delete:
+                    before = df
+                    df, fingerprint = run_step(plan.add(pipeline.DropColumns(columns_to_delete)), df, fingerprint)
+                    st.success(f"Deleted columns: {', '.join(columns_to_delete)}")
+                    preview.show_changes(before, df, "drop_columns")
+                else:
+                    st.warning("No columns selected for deletion.")
+
+            # 2️⃣ **Remove Missing Values**
+            remove_missing = st.radio("Do you want to remove rows with missing values?", ("Yes", "No"))
+            if remove_missing == "Yes":
+                before = df
+                df, fingerprint = run_step(plan.add(pipeline.DropMissing()), df, fingerprint)
+                st.success("Missing values removed!")
+                preview.show_changes(before, df, "drop_missing")
+
+            # 3️⃣ **Fill Missing Values**
+            else:  # Only offer filling missing values if user didn't delete them
+                fill_missing = st.radio("Do you want to fill missing values instead?", ("Yes", "No"))
+                if fill_missing == "Yes":
+                    profile = get_profile(df, fingerprint)
+                    missing_cols = profile.missing_columns()
+
+                    if missing_cols:
+                        before = df
+                        fill_mode = st.radio("Fill mode:", ("One column at a time", "All columns at once"))
+                        if fill_mode == "All columns at once":
+                            fill_values = choose_fill_values(df, profile, missing_cols)
+                            if fill_values is not None:
+                                fill_step = pipeline.ImputeMissing(fill_values)
+                                df, fingerprint = run_step(plan.add(fill_step), df, fingerprint)
+                                st.success(f"Missing values in {len(fill_values)} column(s) have been filled.")
+                                preview.show_changes(before, df, "fill_missing")
+                        else:
                             selected_col = st.selectbox("Select a column to fill missing values:", missing_cols)
 
                             if selected_col:
-                                if df[selected_col].dtype in ['int64', 'float64']:  # Numerical Columns
+                                fill_step = None
+                                if pd.api.types.is_numeric_dtype(df[selected_col]):  # Numerical Columns
                                     method = st.radio(f"Choose a method to fill missing values for {selected_col}:", 
                                                       ("Top", "Median", "Mode", "Mean", "Custom"))
-                                    if method == "Top":
-                                        df[selected_col].fillna(df[selected_col].max(), inplace=True)
-                                    elif method == "Median":
-                                        df[selected_col].fillna(df[selected_col].median(), inplace=True)
-                                    elif method == "Mode":
-                                        df[selected_col].fillna(df[selected_col].mode()[0], inplace=True)
-                                    elif method == "Mean":
-                                        df[selected_col].fillna(df[selected_col].mean(), inplace=True)
-                                    elif method == "Custom":
+                                    if method == "Custom":
                                         custom_value = st.number_input(f"Enter a custom numeric value for {selected_col}:", value=0.0)
-                                        df[selected_col].fillna(custom_value, inplace=True)
+                                        fill_step = pipeline.FillMissing(selected_col, "value", custom_value)
+                                    else:
+                                        fill_methods = {"Top": "max", "Median": "median", "Mode": "mode", "Mean": "mean"}
+                                        fill_step = pipeline.FillMissing(selected_col, fill_methods[method])
 
                                 else:  # Categorical Columns
                                     method = st.radio(f"Choose a method to fill missing values for {selected_col}:", 
                                                       ("Top", "Custom"))
                                     if method == "Top":
-                                        df[selected_col].fillna(df[selected_col].mode()[0], inplace=True)
+                                        fill_step = pipeline.FillMissing(selected_col, "mode")
                                     elif method == "Custom":
                                         custom_value = st.text_input(f"Enter a custom value for {selected_col}:")
                                         if custom_value:
-                                            df[selected_col].fillna(custom_value, inplace=True)
+                                            fill_step = pipeline.FillMissing(selected_col, "value", custom_value)
 
-                            st.success(f"Missing values in '{selected_col}' have been filled.")
-                            st.write("Updated Dataset:")
-                            st.dataframe(df)
-
-                        else:
-                            st.info("No missing values found in the dataset.")
+                                if fill_step is not None:
+                                    df, fingerprint = run_step(plan.add(fill_step), df, fingerprint, profile=profile)
 
-                # 4️⃣ **Remove Duplicate Values**
-                Duplicate_rows = df[df.duplicated()]
-                st.warning(f"Duplicate values in dataset: {Duplicate_rows.shape}")
-
-                dlt_duplicate = st.radio("Do you want to delete duplicate values?", ("Yes", "No"))
-                if dlt_duplicate == "Yes":
-                    df = df.drop_duplicates()
-                    st.success(f"After deleting duplicates, dataset shape: {df.shape}")
-                else:
-                    st.info("Did not delete duplicate values.")
+                            st.success(f"Missing values in '{selected_col}' have been filled.")
+                            preview.show_changes(before, df, "fill_missing")
 
-                # 5️⃣ **Outlier Detection**
-                st.subheader("Outlier Detection")
-                numerical_cols = df.select_dtypes(include=["float64", "int64"]).columns
-                if not numerical_cols.empty:
+                    else:
+                        st.info("No missing values found in the dataset.")
+
+            # 4️⃣ **Remove Duplicate Values**
+            profile = get_profile(df, fingerprint)
+            duplicate_keys = st.multiselect("Key columns for duplicate detection (leave empty to compare all columns):", df.columns)
+            near_duplicates = st.checkbox("Near-duplicate mode (ignore case and extra whitespace in text columns)")
+            if duplicate_keys or near_duplicates:
+                duplicate_count = run_job(("count_duplicates", fingerprint, tuple(duplicate_keys), near_duplicates),
+                                          "Counting duplicates", dedup.count_duplicates, df, duplicate_keys or None, near_duplicates)
+            else:
+                duplicate_count = profile.duplicate_rows
+            st.warning(f"Duplicate values in dataset: {(duplicate_count, df.shape[1])}")
+
+            dlt_duplicate = st.radio("Do you want to delete duplicate values?", ("Yes", "No"))
+            if dlt_duplicate == "Yes":
+                before = df
+                df, fingerprint = run_step(plan.add(pipeline.DropDuplicates(duplicate_keys, near_duplicates)), df, fingerprint, profile=profile)
+                st.success(f"After deleting duplicates, dataset shape: {df.shape}")
+                preview.show_changes(before, df, "drop_duplicates")
+            else:
+                st.info("Did not delete duplicate values.")
+
+            # 5️⃣ **Outlier Detection**
+            st.subheader("Outlier Detection")
+            profile = get_profile(df, fingerprint)
+            numerical_cols = profile.numeric_columns()
+            if numerical_cols:
+                outlier_mode = st.radio("Outlier detection mode:", ("Single column", "All numeric columns"))
+                if outlier_mode == "Single column":
                     selected_col = st.selectbox("Select a numerical column for outlier detection:", numerical_cols)
                     if selected_col:
                         # Plot before removing outliers
-                        fig, ax = plt.subplots(figsize=(8, 5))
-                        sns.boxplot(x=df[selected_col], ax=ax)
-                        ax.set_title(f"Boxplot Before Outlier Removal - {selected_col}")
-                        st.pyplot(fig)
+                        show_outlier_boxplot(df, fingerprint, selected_col, f"Boxplot Before Outlier Removal - {selected_col}")
 
                         # Ask user if they want to remove outliers
                         remove_outliers = st.radio("Do you want to remove outliers?", ("Yes", "No"))
                         if remove_outliers == "Yes":
-                            Q1 = df[selected_col].quantile(0.25)
-                            Q3 = df[selected_col].quantile(0.75)
-                            IQR = Q3 - Q1
-                            lower_bound = Q1 - 1.5 * IQR
-                            upper_bound = Q3 + 1.5 * IQR
-                            df = df[(df[selected_col] >= lower_bound) & (df[selected_col] <= upper_bound)]
+                            before = df
+                            df, fingerprint = run_step(plan.add(pipeline.RemoveOutliers(selected_col)), df, fingerprint, profile=profile)
 
                             # Plot after removing outliers
-                            fig, ax = plt.subplots(figsize=(8, 5))
-                            sns.boxplot(x=df[selected_col], ax=ax)
-                            ax.set_title(f"Boxplot After Outlier Removal - {selected_col}")
-                            st.pyplot(fig)
+                            show_outlier_boxplot(df, fingerprint, selected_col, f"Boxplot After Outlier Removal - {selected_col}")
 
                             st.success(f"Outliers from '{selected_col}' have been removed.")
-
-                        st.write("Dataset after Outlier Removal:")
-                        st.dataframe(df)
-                        
+                            preview.show_changes(before, df, "remove_outliers")
+                else:
+                    # Bounds for every selected column in one vectorized pass
+                    outlier_cols = st.multiselect("Columns to check for outliers:", numerical_cols, default=numerical_cols)
+                    method_label = st.selectbox("Outlier method:", ("IQR", "Z-score", "MAD"))
+                    method = {"IQR": "iqr", "Z-score": "zscore", "MAD": "mad"}[method_label]
+                    threshold = st.number_input("Threshold (IQR multiples, standard deviations or scaled MADs):",
+                                                min_value=0.1, value=outliers.DEFAULT_THRESHOLDS[method], step=0.5)
+                    how = st.radio("Flag a row when the value is an outlier in:", ("any", "all"),
+                                   format_func=lambda how: f"{how} of the selected columns")
+                    if outlier_cols:
+                        bounds = outliers.column_bounds(df, outlier_cols, method, threshold)
+                        flagged = int(outliers.outlier_mask(df, bounds, how).sum())
+                        st.dataframe(bounds)
+                        st.warning(f"Rows flagged as outliers: {flagged}")
+
+                        remove_outliers = st.radio("Do you want to remove outliers?", ("Yes", "No"), key="remove_outliers_multi")
+                        if remove_outliers == "Yes":
+                            before = df
+                            step = pipeline.FilterOutliers(outlier_cols, method, threshold, how)
+                            df, fingerprint = run_step(plan.add(step), df, fingerprint, profile=profile)
+                            st.success(f"Removed {len(before) - len(df)} outlier rows using {method_label}.")
+                            preview.show_changes(before, df, "filter_outliers")
+                    else:
+                        st.warning("No columns selected for outlier detection.")
+
+                st.write("Dataset after Outlier Removal:")
+                preview.show_page(df, "cleaning_result")
+
+            # Keep the cleaned dataset for encoding and visualization
+            save_version(df, "cleaned_version", dataset_name, "cleaned")
+            offer_download(df, fingerprint, "cleaned_download", dataset_name)
+
+            # 6️⃣ **Export or Replay the Cleaning Plan**
+            st.subheader("Cleaning Plan")
+            plan_json = plan.to_json()
+            st.code(plan_json, language="json")
+            st.download_button("Download cleaning plan (JSON)", plan_json,
+                               file_name="cleaning_plan.json", mime="application/json")
+
+            plan_file = st.file_uploader("Replay a saved cleaning plan on this dataset:", type=["json"])
+            if plan_file is not None:
+                try:
+                    saved_plan = pipeline.CleaningPlan.from_json(plan_file.getvalue().decode("utf-8"))
+                    replayed_df, _ = run_job(("replay", raw_fingerprint, saved_plan.to_json()), "Replaying the cleaning plan",
+                                             saved_plan.run, raw_df, raw_fingerprint)
+                    st.success(f"Replayed {len(saved_plan)} step(s), dataset shape: {replayed_df.shape}")
+                    preview.show_page(replayed_df, "replayed")
+                except (ValueError, KeyError, TypeError) as e:
+                    st.error(f"Invalid cleaning plan: {e}")
+                    
     elif section == "Encoding and Decoding":
         st.write("### Encoding and Decoding Section")
 
-        uploaded_file = st.file_uploader("Upload a CSV file for encoding:", type=["csv"])
+        df, fingerprint, dataset_name = choose_dataset("encoding", "Upload a CSV, Parquet or Feather file for encoding:")
 
-        if uploaded_file is not None:
+        if df is not None:
             try:
-                df = pd.read_csv(uploaded_file)  # Read CSV File
                 st.write("### Uploaded Dataset")
-                st.dataframe(df)  # Display the whole dataset
+                preview.show_page(df, "encoding_preview")  # Display one page of the dataset
+
+                operation = st.radio("Select Operation", ["Encode", "Decode"])
+
+                if operation == "Decode":
+                    mapping_file = st.file_uploader("Upload the encoding mapping (JSON) saved when this file was encoded:", type=["json"])
+                    if mapping_file is not None:
+                        try:
+                            mapping = encoding.mapping_from_json(mapping_file.getvalue().decode("utf-8"))
+                            df = run_job(("decode", fingerprint, encoding.mapping_to_json(mapping)), "Decoding",
+                                         encoding.decode, df, mapping)
+                            st.success("Decoding applied successfully.")
+                            st.write("### Decoded Dataset")
+                            preview.show_page(df, "decoded")
+                            save_version(df, "decoded_version", dataset_name, "decoded")
+                            decoded_version = ingest.file_fingerprint(f"{fingerprint}|decoded|{encoding.mapping_to_json(mapping)}".encode())
+                            offer_download(df, decoded_version, "decoded_download", dataset_name)
+                        except ValueError as e:
+                            st.error(f"Could not decode the dataset: {e}")
+                    else:
+                        st.warning("Please upload the mapping file to decode this dataset.")
+                    return
 
-                categorical_columns = df.select_dtypes(include=["object"]).columns.tolist()
+                categorical_columns = df.select_dtypes(include=["object", "string", "category"]).columns.tolist()
 
                 if categorical_columns:
                     selected_columns = st.multiselect("Select columns to encode", categorical_columns)
@@ -212,16 +590,33 @@ def data_cleaning():
                     if selected_columns:
                         encoding_method = st.radio("Select Encoding Method", ["One-Hot Encoding", "Label Encoding"])
 
-                        if encoding_method == "One-Hot Encoding":
-                            df = pd.get_dummies(df, columns=selected_columns)
-                        elif encoding_method == "Label Encoding":
-                            for col in selected_columns:
-                                le = LabelEncoder()  # Initialize LabelEncoder
-                                df[col] = le.fit_transform(df[col])
+                        try:
+                            if encoding_method == "One-Hot Encoding":
+                                top_k = st.number_input("Keep only the top K categories per column (0 = keep all):",
+                                                        min_value=0, value=0, step=1)
+                                estimate = encoding.estimate_one_hot(df, selected_columns, top_k)
+                                st.info(
+                                    f"One-hot output: {estimate['output_columns']} new columns, "
+                                    f"~{estimate['sparse_bytes'] / 1024 ** 2:.1f} MB sparse "
+                                    f"(~{estimate['dense_bytes'] / 1024 ** 2:.1f} MB if dense)"
+                                )
+                                df, mapping = run_job(("one_hot", fingerprint, tuple(selected_columns), top_k), "One-hot encoding",
+                                                      encoding.one_hot_encode, df, selected_columns, top_k)
+                            elif encoding_method == "Label Encoding":
+                                df, mapping = run_job(("label", fingerprint, tuple(selected_columns)), "Label encoding",
+                                                      encoding.label_encode, df, selected_columns)
+                        except ValueError as e:
+                            st.error(str(e))
+                            return
 
                         st.success("Encoding applied successfully.")
-                        st.write("### Encoded Dataset")
-                        st.dataframe(df)  # Display the encoded dataset
+                        st.write(f"### Encoded Dataset ({df.shape[0]} rows, {df.shape[1]} columns)")
+                        preview.show_page(df, "encoded")  # Display one page of the encoded dataset
+                        st.download_button("Download encoding mapping (JSON)", encoding.mapping_to_json(mapping),
+                                           file_name="encoding_mapping.json", mime="application/json")
+                        save_version(df, "encoded_version", dataset_name, "encoded")
+                        encoded_version = ingest.file_fingerprint(f"{fingerprint}|{encoding.mapping_to_json(mapping)}".encode())
+                        offer_download(df, encoded_version, "encoded_download", dataset_name)
                     else:
                         st.warning("Please select at least one column to encode.")
                 else:
@@ -229,66 +624,262 @@ def data_cleaning():
             except Exception as e:
                 st.error(f"Error reading file: {e}")
 
+# Report how much a chart's input was reduced before drawing
+def show_render_info(info):
+    if info["mode"] == "exact":
+        st.caption(f"Exact rendering: {info['points']:,} points drawn.")
+    elif info["mode"] == "empty":
+        st.info(f"None of the {info['points']:,} rows has finite values in both columns, so there is nothing to plot.")
+    elif info["mode"] == "density":
+        st.caption(f"{info['points']:,} points drawn as a density of {info['rendered']:,} non-empty bins.")
+    elif info["mode"] == "aggregated":
+        st.caption(f"{info['points']:,} values summarized into {info['rendered']:,} groups.")
+    else:
+        method = "LTTB" if info["mode"] == "lttb" else "min/max per pixel"
+        st.caption(f"{info['points']:,} points downsampled to {info['rendered']:,} with {method}.")
+
+
+# Group statistics behind a bar chart or boxplot, with a CSV download
+def show_summary_table(summary, by, value):
+    with st.expander("Group statistics"):
+        st.dataframe(summary)
+        st.download_button("Download group statistics (CSV)", summary.to_csv(),
+                           file_name=f"{by}_{value}_summary.csv", mime="text/csv")
+
+
+# Render-time and cache-hit metrics of the figure service
+def show_figure_stats():
+    stats = figures.stats()
+    st.caption(
+        f"Figure cache: {stats['entries']} image(s), {stats['bytes'] / 1024 ** 2:.1f} MB, "
+        f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions; "
+        f"{stats['renders']} renders, last {stats['last_render_seconds']:.2f}s, "
+        f"average {stats['avg_render_seconds']:.2f}s"
+    )
+
+
 # Function for Data Visualization
 def data_visualization_section():
     st.title("Welcome to the Data Visualization section!")
 
-    uploaded_file = st.file_uploader("Upload a CSV file", type="csv")
-    
-    if uploaded_file is not None:
-        if uploaded_file.size == 0:
-            st.error("Uploaded file is empty.")
-        else:
-            try:
-                df = pd.read_csv(uploaded_file)
-                st.success("Dataset Preview:")
-                st.dataframe(df.head())
+    df, fingerprint, _ = choose_dataset("visualization", "Upload a CSV, Parquet or Feather file")
 
-                Viz_Type = st.selectbox(
-                    "Select the visualization type for this data",
-                    ("Scatter Plot", "Bar Chart", "Line Chart", "Histogram", "Boxplot")
-                )
+    if df is not None:
+        st.success("Dataset Preview:")
+        st.dataframe(df.head())
 
-                st.write("Available columns:", list(df.columns))
-                x = st.text_input("Enter the column name for X-Axis")
-                y = st.text_input("Enter the column name for Y-Axis (if applicable)")
-
-                if x in df.columns and (Viz_Type != "Histogram" or y in df.columns):
-                    if Viz_Type == "Scatter Plot":
-                        st.title("Scatter Plot")
-                        fig, ax = plt.subplots()
-                        sns.scatterplot(x=x, y=y, data=df, ax=ax)
-                        st.pyplot(fig)
-
-                    elif Viz_Type == "Bar Chart":
-                        st.title("Bar Chart")
-                        fig, ax = plt.subplots()
-                        sns.barplot(x=x, y=y, data=df, ax=ax)
-                        st.pyplot(fig)
-
-                    elif Viz_Type == "Line Chart":
-                        st.title("Line Chart")
-                        fig, ax = plt.subplots()
-                        sns.lineplot(x=x, y=y, data=df, ax=ax)
-                        st.pyplot(fig)
-
-                    elif Viz_Type == "Histogram":
-                        st.title("Histogram")
-                        fig, ax = plt.subplots()
-                        sns.histplot(df[x], bins=20, kde=True, ax=ax)
-                        st.pyplot(fig)
-
-                    elif Viz_Type == "Boxplot":
-                        st.title("Boxplot")
-                        fig, ax = plt.subplots()
-                        sns.boxplot(x=x, y=y, data=df, ax=ax)
-                        st.pyplot(fig)
+        Viz_Type = st.selectbox(
+            "Select the visualization type for this data",
+            ("Scatter Plot", "Bar Chart", "Line Chart", "Histogram", "Boxplot")
+        )
+
+        st.write("Available columns:", list(df.columns))
+        x = st.text_input("Enter the column name for X-Axis")
+        y = st.text_input("Enter the column name for Y-Axis (if applicable)")
+
+        # Large scatter and line inputs are reduced before drawing unless exact mode is forced
+        exact = False
+        line_method = "lttb"
+        if Viz_Type in ("Scatter Plot", "Line Chart"):
+            exact = st.checkbox("Exact rendering (draw every point)", key="viz_exact")
+        if Viz_Type == "Line Chart" and not exact:
+            line_method = "minmax" if st.radio(
+                "Downsampling method for large inputs", ("LTTB", "Min/Max per pixel")
+            ) == "Min/Max per pixel" else "lttb"
+
+        if x in df.columns and (Viz_Type == "Histogram" or y in df.columns):
+            if Viz_Type == "Scatter Plot":
+                st.title("Scatter Plot")
+                png, render_info = render_figure(
+                    (fingerprint, Viz_Type, x, y, exact),
+                    lambda ax: charts.scatter(ax, df, x, y, exact=exact),
+                )
+                st.image(png)
+                show_render_info(render_info)
+
+            elif Viz_Type == "Bar Chart":
+                st.title("Bar Chart")
+                if pd.api.types.is_numeric_dtype(df[y]):
+                    # Draw from per-group statistics instead of bootstrapping over raw rows
+                    show_ci = st.checkbox("Show 95% confidence intervals", value=True, key="viz_bar_ci")
+                    summary = group_stats(df, fingerprint, x, y)
+                    png, render_info = render_figure(
+                        (fingerprint, Viz_Type, x, y, show_ci),
+                        lambda ax: charts.bar_from_summary(ax, summary, x, y, ci=show_ci),
+                    )
+                    st.image(png)
+                    show_render_info(render_info)
+                    show_summary_table(summary, x, y)
                 else:
-                    st.error("Please provide valid X and Y columns for this visualization.")
-            except pd.errors.ParserError:
-                st.error("Uploaded file is not a valid CSV.")
+                    png, _ = render_figure((fingerprint, Viz_Type, x, y), lambda ax: sns.barplot(x=x, y=y, data=df, ax=ax))
+                    st.image(png)
+
+            elif Viz_Type == "Line Chart":
+                st.title("Line Chart")
+                png, render_info = render_figure(
+                    (fingerprint, Viz_Type, x, y, exact, line_method),
+                    lambda ax: charts.line(ax, df, x, y, exact=exact, method=line_method),
+                )
+                st.image(png)
+                show_render_info(render_info)
+
+            elif Viz_Type == "Histogram":
+                st.title("Histogram")
+                png, _ = render_figure((fingerprint, Viz_Type, x), lambda ax: sns.histplot(df[x], bins=20, kde=True, ax=ax))
+                st.image(png)
+
+            elif Viz_Type == "Boxplot":
+                st.title("Boxplot")
+                if pd.api.types.is_numeric_dtype(df[y]) or pd.api.types.is_numeric_dtype(df[x]):
+                    # Group by the categorical axis; a numeric X with categorical Y gives horizontal boxes
+                    horizontal = not pd.api.types.is_numeric_dtype(df[y])
+                    by, value = (y, x) if horizontal else (x, y)
+                    summary = group_stats(df, fingerprint, by, value)
+                    png, render_info = render_figure(
+                        (fingerprint, Viz_Type, x, y),
+                        lambda ax: charts.box_from_summary(ax, summary, x, y, horizontal=horizontal),
+                    )
+                    st.image(png)
+                    show_render_info(render_info)
+                    show_summary_table(summary, by, value)
+                else:
+                    png, _ = render_figure((fingerprint, Viz_Type, x, y), lambda ax: sns.boxplot(x=x, y=y, data=df, ax=ax))
+                    st.image(png)
+
+            show_figure_stats()
+        else:
+            st.error("Please provide valid X and Y columns for this visualization.")
     else:
-        st.warning("Please upload a CSV file to proceed.")
+        st.warning("Please upload a file or open a saved version to proceed.")
+        
+
+
+# Tables for the query section, named for SQL: saved versions, uploads and files in the
+# server data folder. Nothing is loaded here; the engine scans the files when queried.
+def choose_query_tables():
+    tables = {}
+    versions = [v["name"] for v in store.default_store.versions()]
+    if versions:
+        for name in st.multiselect("Saved versions:", versions, key="query_versions"):
+            tables[query.table_name(name, tables)] = store.default_store.file_path(name)
+    uploaded_files = st.file_uploader("Upload CSV, Parquet or Feather files", type=ingest.UPLOAD_TYPES,
+                                      accept_multiple_files=True, key="query_uploads")
+    for uploaded_file in uploaded_files or []:
+        tables[query.table_name(uploaded_file.name, tables)] = query.save_upload(uploaded_file)
+    data_files = query.data_files()
+    if data_files:
+        for name in st.multiselect(f"Files in {query.DATA_DIR}:", data_files, key="query_files"):
+            tables[query.table_name(name, tables)] = os.path.join(query.DATA_DIR, name)
+    return tables
+
+
+# Close a query connection once no job uses it: its previews and saves still running are
+# cancelled and interrupted, and waited for
+def close_query_connection(signature, connection):
+    owner = (signature, id(connection))
+    pending = [job for job in jobs.default_scheduler.jobs()
+               if job.key[0] in ("query", "query_save") and job.key[1] == owner]
+    for job in pending:
+        jobs.default_scheduler.forget(job.key)
+    connection.interrupt()
+    for job in pending:
+        try:
+            job.result()
+        except BaseException:
+            pass
+    connection.close()
+
+
+# Connection for these tables and engine, kept for the session and rebuilt when either changes.
+# Returns the connection and a key naming it and its tables, used to key the query jobs so
+# that sessions never share a job running on another session's connection.
+def query_connection(tables, engine):
+    signature = (engine, tuple(sorted(tables.items())))
+    cached = st.session_state.get("query_connection")
+    if cached is not None and cached[0] == signature:
+        return (signature, id(cached[1])), cached[1]
+    if cached is not None:
+        st.session_state.pop("query_connection")
+        close_query_connection(*cached)
+    with instrument.span("query_connect", engine=engine, tables=len(tables)):
+        with st.spinner("Opening the tables"):
+            connection = query.connect(tables, engine)
+    st.session_state["query_connection"] = (signature, connection)
+    return (signature, id(connection)), connection
+
+
+# Function for the Query section: SQL over one or more datasets without loading them whole.
+# A preview of the result is shown; the full result is streamed into the dataset store.
+def query_section():
+    st.title("Welcome to the Query section!")
+    st.write("Run SQL over saved versions and uploaded files. Tables are scanned from disk, so files larger than memory can be queried.")
+
+    try:
+        tables = choose_query_tables()
+    except (KeyError, ValueError, OSError) as e:
+        st.error(f"Could not open a table: {e}")
+        return
+    if not tables:
+        st.warning("Please choose a saved version or upload a file to proceed.")
+        return
+
+    engines = query.available_engines()
+    engine = engines[0]
+    if len(engines) > 1:
+        engine = st.selectbox("Query engine:", engines, key="query_engine")
+    elif engine == "sqlite":
+        st.caption("DuckDB is not installed, so tables are copied into SQLite first; `pip install duckdb` to scan them in place.")
+
+    try:
+        owner, connection = query_connection(tables, engine)
+    except query.QUERY_ERRORS + (ValueError, OSError) as e:
+        st.error(f"Could not open the tables: {e}")
+        return
+
+    with st.expander("Tables"):
+        for name, schema in connection.tables.items():
+            st.markdown(f"**{name}**: " + ", ".join(f"{field.name} ({field.type})" for field in schema))
+
+    sql = st.text_area("SQL query:", value=f"SELECT * FROM {next(iter(tables))} LIMIT 100", key="query_sql").strip()
+    if st.button("Run query", key="query_run"):
+        if not sql:
+            st.error("Please enter a query.")
+        else:
+            try:
+                result = run_job(("query", owner, sql), "Running the query", query.preview, connection, sql)
+                st.session_state["query_result"] = (owner, sql, result)
+            except query.QUERY_ERRORS + (ValueError,) as e:
+                st.session_state.pop("query_result", None)
+                st.error(f"Query failed: {e}")
+
+    shown = st.session_state.get("query_result")
+    if shown is None or shown[:2] != (owner, sql):
+        return
+    df, truncated, seconds = shown[2]
+    more = f" (first {len(df):,} rows shown)" if truncated else ""
+    st.caption(f"Query returned {len(df):,} rows{more} in {seconds:.2f}s with {connection.name}")
+    preview.show_page(df, "query_result")
+
+    with st.expander("Save the full result for the other sections"):
+        name = st.text_input("Version name:", value="query result", key="query_version_name").strip()
+        if st.button("Save version", key="query_save"):
+            if not name:
+                st.error("Please enter a name for this version.")
+            else:
+                # Forgotten once finished, so saving again rewrites the version
+                key = ("query_save", owner, sql, name)
+                try:
+                    entry = run_job(key, "Saving the query result", query.save_result,
+                                    connection, sql, store.default_store, name, source="query")
+                    st.success(
+                        f"Saved '{name}' ({entry['rows']:,} rows, {entry['bytes'] / 1024 ** 2:.1f} MB on disk). "
+                        "Open it as a saved version in Data Cleaning or Data Visualization."
+                    )
+                except query.QUERY_ERRORS + (ValueError, OSError) as e:
+                    st.error(f"Could not save the result: {e}")
+                finally:
+                    jobs.default_scheduler.forget(key)
+        show_store_stats()
         
 
 
@@ -307,36 +898,41 @@ with st.sidebar:
         },
     )
 
-# Home Section
-if submenu == "Home":
-    selections = option_menu(
-        menu_title=None,
-        options=['Home', 'Data Cleaning', 'Data Visualization'],
-        icons=['house-fill', 'gear-fill', 'bar-chart-fill'],
-        default_index=0,
-        orientation='horizontal',
-        key="unique_option_menu_key",  # Unique key to avoid conflicts
-        styles={
-            "container": {"padding": "5px 23px", "background-color": "#0d6efd", "border-radius": "8px"},
-            "icon": {"color": "#f9fafb", "font-size": "18px"},
-            "nav-link": {"color": "#f9fafb", "font-size": "15px", "text-align": "center", "margin": "0 10px"},
-            "nav-link-selected": {"background-color": "#ffc107", "font-size": "12px"}
-        }
-    )
+# Every rerun of the selected page is timed stage by stage for the admin performance panel
+with instrument.rerun(submenu, profile=st.session_state.pop("profile_next_rerun", False)):
+    # Home Section
+    if submenu == "Home":
+        selections = option_menu(
+            menu_title=None,
+            options=['Home', 'Data Cleaning', 'Data Visualization', 'Query'],
+            icons=['house-fill', 'gear-fill', 'bar-chart-fill', 'database'],
+            default_index=0,
+            orientation='horizontal',
+            key="unique_option_menu_key",  # Unique key to avoid conflicts
+            styles={
+                "container": {"padding": "5px 23px", "background-color": "#0d6efd", "border-radius": "8px"},
+                "icon": {"color": "#f9fafb", "font-size": "18px"},
+                "nav-link": {"color": "#f9fafb", "font-size": "15px", "text-align": "center", "margin": "0 10px"},
+                "nav-link-selected": {"background-color": "#ffc107", "font-size": "12px"}
+            }
+        )
 
-    if selections=="Data Cleaning":
-            data_cleaning()
-    elif selections=="Data Visualization":
-            data_visualization_section()
-    else:
-        home_page()
+        instrument.annotate(view=selections)
+        if selections=="Data Cleaning":
+                data_cleaning()
+        elif selections=="Data Visualization":
+                data_visualization_section()
+        elif selections=="Query":
+                query_section()
+        else:
+            home_page()
 
-# Contact Section
-elif submenu == "Contact":
-    st.subheader("Contact")
-    st.header(":mailbox: Get In Touch With Us!")
+    # Contact Section
+    elif submenu == "Contact":
+        st.subheader("Contact")
+        st.header(":mailbox: Get In Touch With Us!")
 
-    contact_form = """
+        contact_form = """
     <form action="https://formsubmit.co/ziaullahbj9@gmail.com" method="POST">
         <input type="hidden" name="_captcha" value="false">
         <input type="text" name="name" placeholder="Your name" required>
@@ -345,121 +941,136 @@ elif submenu == "Contact":
         <button type="submit">Send</button>
     </form>
     """
-    st.markdown(contact_form, unsafe_allow_html=True)
-
-    def local_css(file_name):
-        with open(file_name) as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-    local_css("style/style.css")
-
-# Review Section
-elif submenu == "Review":
-    st.header("Review")
-
-    # Connect to Database
-    conn = sqlite3.connect("reviews.db", check_same_thread=False)
-    cursor = conn.cursor()
-
-    # Create Reviews Table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS reviews (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            email TEXT,
-            review TEXT
-        )
-    """)
-    conn.commit()
-
-    # Function to Validate Email
-    def is_valid_email(email):
-        pattern = r'^[\w\.-]+@gmail\.com$'
-        return re.match(pattern, email) is not None
-
-    # Review Submission Form
-    with st.form("review_form"):
-        name = st.text_input("Enter your Name")
-        email = st.text_input("Enter your Email")
-        review = st.text_area("Write your Review")
-        submitted = st.form_submit_button("Submit Review")
-
-        if submitted:
-            if not name or not email or not review:
-                st.error("Please fill out all fields.")
-            elif not is_valid_email(email):
-                st.error("Please enter a valid email address ending with @gmail.com.")
-            else:
-                cursor.execute("INSERT INTO reviews (name, email, review) VALUES (?, ?, ?)", (name, email, review))
-                conn.commit()
-                st.success("Your review has been submitted successfully!")
+        st.markdown(contact_form, unsafe_allow_html=True)
+
+        def local_css(file_name):
+            with open(file_name) as f:
+                st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+        local_css("style/style.css")
+
+    # Review Section
+    elif submenu == "Review":
+        st.header("Review")
+
+        # Shared connection pool; the schema is set up once per process, not on every rerun
+        repository = reviews.get_repository()
+
+        # Function to Validate Email
+        def is_valid_email(email):
+            pattern = r'^[\w\.-]+@gmail\.com$'
+            return re.match(pattern, email) is not None
+
+        # Keyset pagination: each page starts below the last id of the previous one, and the
+        # stack of page starts lives in session state so "Previous page" can go back
+        def next_page(key):
+            st.session_state[f"{key}_starts"].append(st.session_state[f"{key}_last_id"])
+
+        def previous_page(key):
+            st.session_state[f"{key}_starts"].pop()
+
+        def review_page(key, email=None, search=""):
+            # A new filter starts again from the newest review
+            if st.session_state.get(f"{key}_filter") != (email, search):
+                st.session_state[f"{key}_filter"] = (email, search)
+                st.session_state[f"{key}_starts"] = [None]
+            starts = st.session_state.setdefault(f"{key}_starts", [None])
+            rows, has_more = repository.page(starts[-1], email=email, search=search)
+            st.session_state[f"{key}_last_id"] = rows[-1]["id"] if rows else None
+            return rows, has_more, len(starts)
+
+        def page_buttons(key, has_more, page_number):
+            col1, col2 = st.columns(2)
+            with col1:
+                st.button("Previous page", key=f"{key}_previous", on_click=previous_page, args=(key,),
+                          disabled=page_number == 1)
+            with col2:
+                st.button("Next page", key=f"{key}_next", on_click=next_page, args=(key,), disabled=not has_more)
+
+        # Review Submission Form
+        with st.form("review_form"):
+            name = st.text_input("Enter your Name")
+            email = st.text_input("Enter your Email")
+            review = st.text_area("Write your Review")
+            submitted = st.form_submit_button("Submit Review")
+
+            if submitted:
+                if not name or not email or not review:
+                    st.error("Please fill out all fields.")
+                elif not is_valid_email(email):
+                    st.error("Please enter a valid email address ending with @gmail.com.")
+                else:
+                    repository.add(name, email, review)
+                    st.success("Your review has been submitted successfully!")
 
-    # Buttons for Admin Panel & Show All Reviews
-    col1, col2 = st.columns(2)
+        # Buttons for Admin Panel & Show All Reviews
+        col1, col2 = st.columns(2)
 
-    with col1:
-        if st.button("Admin Panel"):
-            st.session_state.show_admin_login = True
+        with col1:
+            if st.button("Admin Panel"):
+                st.session_state.show_admin_login = True
     
-    with col2:
-        if st.button("Show Over All Reviews"):
-            st.session_state.show_reviews = True
-
-    # Show All Reviews
-    if "show_reviews" in st.session_state and st.session_state.show_reviews:
-        st.subheader("All User Reviews")
-        cursor.execute("SELECT name, review FROM reviews")
-        reviews = cursor.fetchall()
-
-        if not reviews:
-            st.info("No reviews found.")
-        else:
-            for review in reviews:
-                st.write(f"**{review[0]}:** {review[1]}")
-
-    # Admin Login Page
-    if "show_admin_login" in st.session_state and st.session_state.show_admin_login:
-        st.subheader("Admin Login")
-        admin_email = st.text_input("Admin Email")
-        admin_password = st.text_input("Admin Password", type="password")
-        admin_login = st.button("Login as Admin")
-
-        if admin_login:
-            if admin_email == "admin@gmail.com" and admin_password == "admin@##123":
-                st.session_state.admin_logged_in = True
-                st.success("Admin Logged In Successfully!")
+        with col2:
+            if st.button("Show Over All Reviews"):
+                st.session_state.show_reviews = True
 
-        if "admin_logged_in" in st.session_state and st.session_state.admin_logged_in:
-            st.subheader("Manage Reviews")
+        # Show All Reviews, one page at a time
+        if "show_reviews" in st.session_state and st.session_state.show_reviews:
+            st.subheader("All User Reviews")
+            search = st.text_input("Search reviews", key="reviews_search")
+            rows, has_more, page_number = review_page("reviews", search=search)
 
-            # Fetch and Display All Reviews for Admin
-            cursor.execute("SELECT * FROM reviews")
-            reviews = cursor.fetchall()
-
-            if not reviews:
+            if not rows:
                 st.info("No reviews found.")
             else:
-                review_ids_to_delete = []
-                for review in reviews:
-                    st.write(f"**ID:** {review[0]}")
-                    st.write(f"**Name:** {review[1]}")
-                    st.write(f"**Email:** {review[2]}")
-                    st.write(f"**Review:** {review[3]}")
-
-                    # Use a form for delete buttons to handle state properly
-                    with st.form(f"delete_form_{review[0]}"):
-                        delete_button = st.form_submit_button(f"Delete Review {review[0]}")
-
-                        if delete_button:
-                            review_ids_to_delete.append(review[0])
-
-                # Process Deletion
-                if review_ids_to_delete:
-                    for review_id in review_ids_to_delete:
-                        cursor.execute("DELETE FROM reviews WHERE id = ?", (review_id,))
-                    conn.commit()
-                    st.success("Selected review(s) deleted! Refreshing...")
-                    st.experimental_rerun()
+                for row in rows:
+                    st.write(f"**{row['name']}:** {row['review']}")
+                page_buttons("reviews", has_more, page_number)
+
+        # Admin Login Page
+        if "show_admin_login" in st.session_state and st.session_state.show_admin_login:
+            st.subheader("Admin Login")
+            admin_email = st.text_input("Admin Email")
+            admin_password = st.text_input("Admin Password", type="password")
+            admin_login = st.button("Login as Admin")
+
+            if admin_login:
+                if admin_email == "admin@gmail.com" and admin_password == "admin@##123":
+                    st.session_state.admin_logged_in = True
+                    st.success("Admin Logged In Successfully!")
+
+            if "admin_logged_in" in st.session_state and st.session_state.admin_logged_in:
+                show_performance_panel()
+
+                st.subheader("Manage Reviews")
+                st.caption(f"{repository.count():,} review(s) in total")
+
+                # One page of reviews for the admin, optionally filtered by email or text
+                filter_email = st.text_input("Filter by reviewer email", key="admin_reviews_email").strip()
+                search = st.text_input("Search reviews", key="admin_reviews_search")
+                rows, has_more, page_number = review_page("admin_reviews", email=filter_email or None, search=search)
+
+                if not rows:
+                    st.info("No reviews found.")
+                else:
+                    # Select any number of reviews and delete them together in one transaction
+                    with st.form("delete_reviews_form"):
+                        review_ids_to_delete = [
+                            row["id"]
+                            for row in rows
+                            if st.checkbox(
+                                f"**ID {row['id']}** {row['name']} ({row['email']}): {row['review']}",
+                                key=f"delete_review_{row['id']}",
+                            )
+                        ]
+                        delete_button = st.form_submit_button("Delete Selected Reviews")
+                    page_buttons("admin_reviews", has_more, page_number)
+
+                    # Process Deletion
+                    if delete_button and review_ids_to_delete:
+                        deleted = repository.delete_many(review_ids_to_delete)
+                        st.success(f"{deleted} review(s) deleted! Refreshing...")
+                        st.rerun()
 
 
 
@@ -0,0 +1 @@
+# Reproducible benchmarks for every stage of the app: run `python -m benchmarks --help`
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+
+# Where generated CSV files are kept between runs (override with ANALYSIS_BENCHMARK_DATA)
+DATA_DIR = os.environ.get("ANALYSIS_BENCHMARK_DATA", os.path.join(tempfile.gettempdir(), "analysis-benchmarks"))
+# Rows generated and written at a time, so a 10M-row file never sits in memory whole
+CHUNK_ROWS = 1_000_000
+
+# Shape of the synthetic dataset: how many columns of each type, and the rates of missing
+# values, repeated rows and outliers. cardinality is the number of distinct values in every
+# categorical and integer column.
+DEFAULT_PARAMS = {
+    "numeric": 3,
+    "integer": 1,
+    "categorical": 2,
+    "text": 1,
+    "datetime": 1,
+    "null_rate": 0.05,
+    "duplicate_rate": 0.02,
+    "cardinality": 50,
+    "outlier_rate": 0.01,
+    "seed": 0,
+}
+
+WORDS = np.array(["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"])
+
+
+def _params(params):
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown dataset parameters: {', '.join(sorted(unknown))}")
+    merged = dict(DEFAULT_PARAMS, **params)
+    for rate in ("null_rate", "duplicate_rate", "outlier_rate"):
+        if not 0 <= merged[rate] < 1:
+            raise ValueError(f"{rate} must be between 0 and 1")
+    if merged["cardinality"] < 1:
+        raise ValueError("cardinality must be at least 1")
+    return merged
+
+
+# Column names of a generated dataset, by type
+def column_names(**params):
+    params = _params(params)
+    return {
+        kind: [f"{kind}_{number}" for number in range(params[kind])]
+        for kind in ("numeric", "integer", "categorical", "text", "datetime")
+    }
+
+
+# One chunk of synthetic rows. Every chunk is drawn from its own seeded generator, so the same
+# parameters always give the same data. Outliers are numeric values pushed 20-50 standard
+# deviations out; duplicates are copies of earlier rows of the same chunk.
+def generate(rows, chunk=0, **params):
+    params = _params(params)
+    names = column_names(**params)
+    rng = np.random.default_rng([params["seed"], chunk])
+    cardinality = params["cardinality"]
+    columns = {}
+
+    for name in names["numeric"]:
+        values = rng.normal(100.0, 15.0, rows)
+        outliers = rng.random(rows) < params["outlier_rate"]
+        values[outliers] += rng.choice([-1.0, 1.0], outliers.sum()) * rng.uniform(300.0, 750.0, outliers.sum())
+        columns[name] = values
+    for name in names["integer"]:
+        columns[name] = rng.integers(0, cardinality, rows)
+    for name in names["categorical"]:
+        categories = [f"{name}_value_{code}" for code in range(cardinality)]
+        columns[name] = pd.Categorical.from_codes(rng.integers(0, cardinality, rows), categories)
+    for name in names["text"]:
+        first, second = WORDS[rng.integers(0, len(WORDS), rows)], WORDS[rng.integers(0, len(WORDS), rows)]
+        columns[name] = np.char.add(np.char.add(first, " "), second).astype(object)
+    for name in names["datetime"]:
+        seconds = rng.integers(0, 365 * 24 * 3600, rows)
+        columns[name] = pd.Timestamp("2024-01-01") + pd.to_timedelta(seconds, unit="s")
+
+    df = pd.DataFrame(columns)
+    if params["null_rate"] > 0:
+        for name in df.columns:
+            missing = rng.random(rows) < params["null_rate"]
+            if name in names["integer"]:
+                df[name] = df[name].astype("Int64")
+            df.loc[missing, name] = None
+    if params["duplicate_rate"] > 0 and rows > 1:
+        copies = np.flatnonzero(rng.random(rows) < params["duplicate_rate"])
+        copies = copies[copies > 0]
+        order = np.arange(rows)
+        order[copies] = (rng.random(len(copies)) * copies).astype(np.int64)
+        # A copied row may itself be a copy; follow each chain back to its original row
+        while True:
+            resolved = order[order]
+            if np.array_equal(resolved, order):
+                break
+            order = resolved
+        df = df.take(order).reset_index(drop=True)
+    return df
+
+
+# Write `rows` synthetic rows to a CSV file, one chunk at a time
+def write_csv(path, rows, chunk_rows=CHUNK_ROWS, **params):
+    writer = None
+    try:
+        for chunk, start in enumerate(range(0, rows, chunk_rows)):
+            table = pa.Table.from_pandas(generate(min(chunk_rows, rows - start), chunk, **params), preserve_index=False)
+            if writer is None:
+                writer = pa_csv.CSVWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+
+# Path of the CSV for these parameters, generating it on first use. Files are named after
+# their parameters, so each size and shape is generated once and reused by later runs.
+def dataset_path(rows, data_dir=DATA_DIR, **params):
+    params = _params(params)
+    digest = hashlib.blake2b(json.dumps(params, sort_keys=True).encode(), digest_size=6).hexdigest()
+    path = os.path.join(data_dir, f"synthetic_{rows}_{digest}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        temp_path = path + ".tmp"
+        write_csv(temp_path, rows, **params)
+        os.replace(temp_path, path)
+    return path
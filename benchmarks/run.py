@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks import datasets
+from benchmarks.stages import REVIEW_ROWS, STAGES, Context
+
+
+# Dataset sizes run by default
+ROWS = (10_000, 1_000_000, 10_000_000)
+# Baseline the results are compared against when it exists (written with --save-baseline)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# A stage regresses when it is this much slower (or uses this much more memory) than the
+# baseline, and by more than the absolute margins below, which keep noise on tiny timings out
+TOLERANCE = 0.2
+MIN_SECONDS = 0.05
+MIN_MB = 16.0
+
+# Stages that need another stage to have run first
+REQUIRES = {"reviews_list": "reviews_insert", "reviews_delete": "reviews_insert"}
+REVIEW_STAGES = ("reviews_insert", "reviews_list", "reviews_delete")
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Samples the process's resident memory on a background thread while a stage runs and keeps
+# the highest value. Memory is read from /proc, so peaks are only recorded on Linux.
+class PeakMemory:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = _rss_bytes()
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_bytes())
+
+    def __enter__(self):
+        if self.start is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, _rss_bytes())
+
+    # Peak resident memory above what the process used when the stage started
+    def growth_mb(self):
+        return None if self.start is None else (self.peak - self.start) / 1024 ** 2
+
+    def peak_mb(self):
+        return None if self.peak is None else self.peak / 1024 ** 2
+
+
+# Stage names in run order, with the stages they depend on added
+def select(names=None):
+    names = list(STAGES) if not names else names
+    unknown = [name for name in names if name not in STAGES]
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(unknown)}")
+    wanted = set(names)
+    for name in names:
+        wanted.add(REQUIRES.get(name, name if name in REVIEW_STAGES else "load_csv"))
+    return [name for name in STAGES if name in wanted]
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "pyarrow": pa.__version__,
+    }
+
+
+# Time every selected stage on a generated dataset of `rows` rows. Each stage runs `repeat`
+# times; the fastest run is reported, as the one least disturbed by the rest of the machine.
+def run_size(rows, stages, repeat=1, review_rows=REVIEW_ROWS, data_params=None, log=print):
+    data_params = data_params or {}
+    started = time.perf_counter()
+    path = datasets.dataset_path(rows, **data_params)
+    log(f"{rows:,} rows: dataset ready in {time.perf_counter() - started:.1f}s ({os.path.getsize(path) / 1024 ** 2:.0f} MB)")
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        ctx = Context(path, datasets.column_names(**data_params), work_dir, min(rows, review_rows))
+        runs = {name: [] for name in stages}
+        for _ in range(repeat):
+            for name in stages:
+                with PeakMemory() as memory:
+                    stage_started = time.perf_counter()
+                    output_rows = STAGES[name](ctx)
+                    seconds = time.perf_counter() - stage_started
+                runs[name].append((seconds, memory, output_rows))
+        for name in stages:
+            seconds = [run[0] for run in runs[name]]
+            growth = [run[1].growth_mb() for run in runs[name] if run[1].growth_mb() is not None]
+            peaks = [run[1].peak_mb() for run in runs[name] if run[1].peak_mb() is not None]
+            result = {
+                "rows": rows,
+                "stage": name,
+                "seconds": min(seconds),
+                "runs": seconds,
+                "peak_growth_mb": max(growth) if growth else None,
+                "peak_rss_mb": max(peaks) if peaks else None,
+                "output_rows": runs[name][-1][2],
+            }
+            results.append(result)
+            log(_format_result(result))
+    return results
+
+
+def _format_result(result):
+    memory = "" if result["peak_growth_mb"] is None else f"  +{result['peak_growth_mb']:8.1f} MB"
+    return f"  {result['stage']:<22}{result['seconds']:10.3f}s{memory}  ({result['output_rows']:,} rows)"
+
+
+def run(sizes=ROWS, stages=None, repeat=1, review_rows=REVIEW_ROWS, data_params=None, log=print):
+    stages = select(stages)
+    results = []
+    for rows in sizes:
+        results += run_size(rows, stages, repeat, review_rows, data_params, log)
+    return {
+        "created": time.time(),
+        "environment": environment(),
+        "dataset": dict(datasets.DEFAULT_PARAMS, **(data_params or {})),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+# Stage-by-stage comparison with a baseline run. Returns one row per stage and size present
+# in both, flagging the ones slower or hungrier than the baseline beyond the tolerance.
+def compare(current, baseline, tolerance=TOLERANCE, min_seconds=MIN_SECONDS, min_mb=MIN_MB):
+    previous = {(result["rows"], result["stage"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get((result["rows"], result["stage"]))
+        if before is None:
+            continue
+        slower = (
+            result["seconds"] > before["seconds"] * (1 + tolerance)
+            and result["seconds"] - before["seconds"] > min_seconds
+        )
+        hungrier = (
+            result["peak_growth_mb"] is not None and before["peak_growth_mb"] is not None
+            and result["peak_growth_mb"] > before["peak_growth_mb"] * (1 + tolerance)
+            and result["peak_growth_mb"] - before["peak_growth_mb"] > min_mb
+        )
+        rows.append({
+            "rows": result["rows"],
+            "stage": result["stage"],
+            "baseline_seconds": before["seconds"],
+            "seconds": result["seconds"],
+            "change": result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0,
+            "baseline_peak_growth_mb": before["peak_growth_mb"],
+            "peak_growth_mb": result["peak_growth_mb"],
+            "regression": slower or hungrier,
+        })
+    return rows
+
+
+def _format_comparison(row):
+    flag = "  REGRESSION" if row["regression"] else ""
+    memory = ""
+    if row["peak_growth_mb"] is not None and row["baseline_peak_growth_mb"] is not None:
+        memory = f"  memory {row['baseline_peak_growth_mb']:.0f} -> {row['peak_growth_mb']:.0f} MB"
+    return (
+        f"  {row['rows']:>12,}  {row['stage']:<22}{row['baseline_seconds']:9.3f}s -> {row['seconds']:9.3f}s "
+        f"({row['change']:+.0%}){memory}{flag}"
+    )
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time every stage of the app on synthetic datasets and compare with a baseline.",
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=list(ROWS), help="dataset sizes (default: 10k 1M 10M)")
+    parser.add_argument("--stages", nargs="+", default=None, help=f"stages to run (default: all): {' '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage; the fastest is kept (default: 1)")
+    parser.add_argument("--review-rows", type=int, default=REVIEW_ROWS,
+                        help=f"reviews written by the review stages (default: {REVIEW_ROWS})")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON to compare with, if it exists")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative slowdown that counts as a regression (default: 0.2)")
+    for name, default in datasets.DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default,
+                            help=f"dataset {name.replace('_', ' ')} (default: {default})")
+    args = parser.parse_args(argv)
+
+    data_params = {name: getattr(args, name) for name in datasets.DEFAULT_PARAMS}
+    results = run(args.rows, args.stages, args.repeat, args.review_rows, data_params)
+    if args.output:
+        save(results, args.output)
+        print(f"Results written to {args.output}")
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = load(args.baseline)
+        if baseline["dataset"] != results["dataset"]:
+            print("Baseline was run on a different dataset shape; timings may not be comparable")
+        rows = compare(results, baseline, args.tolerance)
+        print(f"Compared with {args.baseline}:")
+        for row in rows:
+            print(_format_comparison(row))
+        regressions = sum(row["regression"] for row in rows)
+        print(f"{regressions} regression(s) in {len(rows)} comparable stage(s)")
+        status = 1 if regressions else 0
+    if args.save_baseline:
+        save(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
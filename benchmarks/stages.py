@@ -0,0 +1,179 @@
+import os
+import time
+
+import seaborn as sns
+
+import aggregate
+import charts
+import encoding
+import figures
+import imputation
+import ingest
+import pipeline
+import profiling
+import reviews
+
+
+# Reviews written, paged through and deleted by the review stages (fewer for smaller datasets)
+REVIEW_ROWS = 10_000
+
+
+# Everything the stages share: the generated file, its column names by type, and what
+# earlier stages produced (the loaded frame, its profile, the review repository).
+class Context:
+    def __init__(self, path, names, work_dir, review_rows=REVIEW_ROWS):
+        self.path = path
+        self.names = names
+        self.work_dir = work_dir
+        self.review_rows = review_rows
+        self.data = None
+        self.df = None
+        self.profile = None
+        self.repository = None
+
+    def column(self, kind):
+        return self.names[kind][0] if self.names[kind] else None
+
+
+# Rendered through the figure service like the app's charts, under a key that never hits
+# its cache
+def _render(name, draw):
+    png, _ = figures.render(("benchmark", name, time.perf_counter_ns()), draw)
+    return len(png)
+
+
+# Each stage does what the matching control in app.py does and returns the number of rows
+# it produced (reviews written, listed or deleted for the review stages), which is recorded
+# next to its timing
+
+def load_csv(ctx):
+    if ctx.data is None:
+        with open(ctx.path, "rb") as f:
+            ctx.data = f.read()
+    ctx.df, _ = ingest.read_file(ctx.data, "csv")
+    return len(ctx.df)
+
+
+def load_csv_optimized(ctx):
+    df, _ = ingest.read_file(ctx.data, "csv", optimize=True, engine="pyarrow")
+    return len(df)
+
+
+def profile_nulls(ctx):
+    ctx.profile = profiling.profile_frame(ctx.df)
+    return ctx.profile.rows
+
+
+def fill_missing(ctx):
+    values = imputation.fit(ctx.df, profile=ctx.profile)
+    return len(imputation.transform(ctx.df, values))
+
+
+def drop_duplicates(ctx):
+    return len(pipeline.DropDuplicates().apply(ctx.df))
+
+
+def drop_near_duplicates(ctx):
+    return len(pipeline.DropDuplicates(normalize=True).apply(ctx.df))
+
+
+def remove_outliers(ctx):
+    return len(pipeline.RemoveOutliers(ctx.column("numeric")).apply(ctx.df, ctx.profile))
+
+
+def filter_outliers(ctx):
+    return len(pipeline.FilterOutliers(ctx.names["numeric"]).apply(ctx.df, ctx.profile))
+
+
+def one_hot_encode(ctx):
+    df, _ = encoding.one_hot_encode(ctx.df, ctx.names["categorical"])
+    return len(df)
+
+
+def label_encode(ctx):
+    df, _ = encoding.label_encode(ctx.df, ctx.names["categorical"])
+    return len(df)
+
+
+def scatter_chart(ctx):
+    x, y = ctx.names["numeric"][:2]
+    _render("scatter", lambda ax: charts.scatter(ax, ctx.df, x, y))
+    return len(ctx.df)
+
+
+def bar_chart(ctx):
+    x, y = ctx.column("categorical"), ctx.column("numeric")
+    summary = aggregate.group_stats(ctx.df, x, y)
+    _render("bar", lambda ax: charts.bar_from_summary(ax, summary, x, y))
+    return len(ctx.df)
+
+
+def line_chart(ctx):
+    x, y = ctx.column("integer") or ctx.names["numeric"][1], ctx.column("numeric")
+    _render("line", lambda ax: charts.line(ax, ctx.df, x, y))
+    return len(ctx.df)
+
+
+def histogram(ctx):
+    x = ctx.column("numeric")
+    _render("histogram", lambda ax: sns.histplot(ctx.df[x], bins=20, kde=True, ax=ax))
+    return len(ctx.df)
+
+
+def boxplot(ctx):
+    x, y = ctx.column("categorical"), ctx.column("numeric")
+    summary = aggregate.group_stats(ctx.df, x, y)
+    _render("boxplot", lambda ax: charts.box_from_summary(ax, summary, x, y))
+    return len(ctx.df)
+
+
+# Review stages run against a fresh database file; each review is added in its own
+# transaction, as the review form does
+def reviews_insert(ctx):
+    path = os.path.join(ctx.work_dir, f"reviews_{time.perf_counter_ns()}.db")
+    ctx.repository = reviews.ReviewRepository(reviews.ConnectionPool(path))
+    for number in range(ctx.review_rows):
+        ctx.repository.add(f"Reviewer {number}", f"reviewer{number % 100}@gmail.com", f"Review number {number} of the app")
+    return ctx.review_rows
+
+
+# Page through every review newest first, then through one search and one email filter
+def reviews_list(ctx):
+    listed = 0
+    for filters in ({}, {"search": "number"}, {"email": "reviewer7@gmail.com"}):
+        before_id, has_more = None, True
+        while has_more:
+            rows, has_more = ctx.repository.page(before_id, **filters)
+            listed += len(rows)
+            if rows:
+                before_id = rows[-1]["id"]
+    return listed
+
+
+def reviews_delete(ctx):
+    deleted = ctx.repository.delete_many(range(1, ctx.review_rows + 1, 2))
+    ctx.repository.pool.close()
+    return deleted
+
+
+# Stages in the order they run; later stages use the frame loaded by load_csv
+STAGES = {
+    "load_csv": load_csv,
+    "load_csv_optimized": load_csv_optimized,
+    "profile_nulls": profile_nulls,
+    "fill_missing": fill_missing,
+    "drop_duplicates": drop_duplicates,
+    "drop_near_duplicates": drop_near_duplicates,
+    "remove_outliers": remove_outliers,
+    "filter_outliers": filter_outliers,
+    "one_hot_encode": one_hot_encode,
+    "label_encode": label_encode,
+    "scatter_chart": scatter_chart,
+    "bar_chart": bar_chart,
+    "line_chart": line_chart,
+    "histogram": histogram,
+    "boxplot": boxplot,
+    "reviews_insert": reviews_insert,
+    "reviews_list": reviews_list,
+    "reviews_delete": reviews_delete,
+}
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.colors import LogNorm
+
+
+# Inputs with more points than this are downsampled unless exact rendering is requested
+LARGE_POINTS = 50_000
+# Points kept by LTTB and horizontal buckets used by min/max downsampling
+LINE_POINTS = 2_000
+LINE_PIXELS = 1_000
+# Grid used for 2D-binned scatter density
+DENSITY_BINS = (400, 300)
+
+
+# Largest-Triangle-Three-Buckets: indices of `threshold` points that preserve the
+# visual shape of a line. x must be sorted.
+def lttb(x, y, threshold=LINE_POINTS):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Pick the point in this bucket forming the largest triangle with the previous pick
+        # and the average of the next bucket
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+# Indices of the minimum and maximum y in each of `pixels` equal-width x buckets,
+# plus the first and last points. x must be sorted.
+def minmax_downsample(x, y, pixels=LINE_PIXELS):
+    n = len(x)
+    if n <= 2 * pixels:
+        return np.arange(n)
+    span = x[-1] - x[0]
+    if span == 0:
+        buckets = np.zeros(n, dtype=np.int64)
+    else:
+        buckets = ((x - x[0]) / span * (pixels - 1)).astype(np.int64)
+    order = np.lexsort((y, buckets))
+    starts = np.flatnonzero(np.r_[True, np.diff(buckets[order]) != 0])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([[0, n - 1], order[starts], order[ends]]))
+
+
+# float64 values of a numeric or datetime column (datetimes as nanoseconds since the epoch,
+# in local wall time for time-zone-aware columns), or None for any other column
+def _axis_values(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if series.dt.tz is not None:
+            series = series.dt.tz_localize(None)
+        return series.astype("datetime64[ns]").to_numpy().view(np.int64).astype(np.float64)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64)
+    return None
+
+
+# Values computed on an axis, back in the column's type for drawing
+def _axis_for_plot(values, is_datetime):
+    return np.round(values).astype(np.int64).astype("datetime64[ns]") if is_datetime else values
+
+
+# Numeric x/y arrays with missing and infinite values dropped, plus whether each axis holds
+# datetimes; None when a column is neither numeric nor datetime
+def _numeric_xy(df, x, y):
+    columns = df[list(dict.fromkeys([x, y]))].dropna()
+    xs, ys = _axis_values(columns[x]), _axis_values(columns[y])
+    if xs is None or ys is None:
+        return None
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    datetimes = (pd.api.types.is_datetime64_any_dtype(columns[x]), pd.api.types.is_datetime64_any_dtype(columns[y]))
+    return xs[finite], ys[finite], datetimes
+
+
+# Scatter plot; large numeric or datetime inputs are drawn as a 2D-binned density instead of individual points.
+# Returns how many points the input had and how many marks were drawn.
+def scatter(ax, df, x, y, exact=False, bins=DENSITY_BINS):
+    points = len(df)
+    xy = None if exact or points <= LARGE_POINTS else _numeric_xy(df, x, y)
+    if xy is None:
+        sns.scatterplot(x=x, y=y, data=df, ax=ax)
+        return {"mode": "exact", "points": points, "rendered": points}
+
+    if not len(xy[0]):
+        ax.text(0.5, 0.5, "No finite (x, y) pairs to plot", ha="center", va="center", transform=ax.transAxes)
+        ax.set_xlabel(x)
+        ax.set_ylabel(y)
+        return {"mode": "empty", "points": points, "rendered": 0}
+
+    counts, x_edges, y_edges = np.histogram2d(xy[0], xy[1], bins=bins)
+    x_edges, y_edges = _axis_for_plot(x_edges, xy[2][0]), _axis_for_plot(y_edges, xy[2][1])
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap="viridis", norm=LogNorm())
+    ax.figure.colorbar(mesh, ax=ax, label="points per bin")
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return {"mode": "density", "points": points, "rendered": int(np.count_nonzero(counts))}
+
+
+# Line plot; large numeric or datetime inputs are averaged per x value (as seaborn's estimator does)
+# and then downsampled with LTTB or min/max-per-pixel before drawing.
+def line(ax, df, x, y, exact=False, method="lttb"):
+    points = len(df)
+    xy = None if exact or points <= LARGE_POINTS else _numeric_xy(df, x, y)
+    if xy is None:
+        sns.lineplot(x=x, y=y, data=df, ax=ax)
+        return {"mode": "exact", "points": points, "rendered": points}
+
+    means = pd.Series(xy[1]).groupby(xy[0], sort=True).mean()
+    xs, ys = means.index.to_numpy(dtype=np.float64), means.to_numpy()
+    keep = minmax_downsample(xs, ys) if method == "minmax" else lttb(xs, ys)
+    ax.plot(_axis_for_plot(xs[keep], xy[2][0]), _axis_for_plot(ys[keep], xy[2][1]))
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return {"mode": method, "points": points, "rendered": len(keep)}
+
+
+# Bar chart of group means drawn from an aggregate.group_stats summary,
+# with analytic 95% CI error bars when ci is True
+def bar_from_summary(ax, summary, x, y, ci=True):
+    summary = summary[summary["count"] > 0]
+    positions = np.arange(len(summary))
+    yerr = None
+    if ci:
+        yerr = np.vstack([summary["mean"] - summary["ci_low"], summary["ci_high"] - summary["mean"]])
+    ax.bar(positions, summary["mean"], yerr=yerr, capsize=3, color=sns.color_palette()[0])
+    ax.set_xticks(positions)
+    ax.set_xticklabels(summary.index.astype(str))
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return {"mode": "aggregated", "points": int(summary["count"].sum()), "rendered": len(summary)}
+
+
+# Boxplot drawn from precomputed quartiles and whisker ends; points beyond the whiskers
+# are counted in the summary instead of being drawn
+def box_from_summary(ax, summary, x, y, horizontal=False):
+    summary = summary[summary["count"] > 0]
+    stats = [
+        {
+            "label": str(group),
+            "q1": row["q1"],
+            "med": row["median"],
+            "q3": row["q3"],
+            "whislo": row["whisker_low"],
+            "whishi": row["whisker_high"],
+            "mean": row["mean"],
+            "fliers": [],
+        }
+        for group, row in summary.iterrows()
+    ]
+    if horizontal:
+        try:
+            ax.bxp(stats, showfliers=False, orientation="horizontal")
+        except TypeError:  # matplotlib < 3.10
+            ax.bxp(stats, showfliers=False, vert=False)
+    else:
+        ax.bxp(stats, showfliers=False)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    return {"mode": "aggregated", "points": int(summary["count"].sum()), "rendered": len(summary)}
@@ -0,0 +1,135 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Columns compared in near-duplicate mode after lowercasing and collapsing whitespace
+def _normalize_text(series):
+    return series.astype("string").str.strip().str.lower().str.replace(r"\s+", " ", regex=True)
+
+
+# Key columns as they are compared (all columns when subset is None). Float columns get 0.0
+# added so -0.0 hashes like 0.0, which pandas treats as equal. With normalize=True, text
+# columns are compared case- and whitespace-insensitively. With widen_numeric=True, numeric
+# columns become float64 so chunks whose dtypes were inferred differently (int64 vs float64,
+# nullable or not) still compare equal values alike.
+def _key_columns(df, subset=None, normalize=False, widen_numeric=False):
+    keys = df if subset is None else df[list(subset)]
+    converted = {}
+    for col in keys.columns:
+        series = keys[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if widen_numeric and pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0
+            converted[col] = pd.Series(values, index=series.index)
+        elif pd.api.types.is_float_dtype(series):
+            converted[col] = series + 0.0
+        elif normalize and not pd.api.types.is_numeric_dtype(series):
+            converted[col] = _normalize_text(series)
+    if converted:
+        keys = keys.copy(deep=False)
+        for col, values in converted.items():
+            keys[col] = values
+    return keys
+
+
+# One uint64 hash per row over the key columns. Object columns are hashed by their string
+# form, so 1 and "1" hash alike, and distinct rows can (rarely) collide on 64 bits.
+def row_hashes(df, subset=None, normalize=False, widen_numeric=False):
+    return pd.util.hash_pandas_object(_key_columns(df, subset, normalize, widen_numeric), index=False).to_numpy()
+
+
+# Mask of rows that repeat an earlier row. Row hashes pick out the candidates cheaply; only
+# rows whose hash repeats are then compared by value, so hash collisions (and 1 vs "1" in an
+# object column) never drop a distinct row.
+def duplicated_mask(df, subset=None, normalize=False):
+    keys = _key_columns(df, subset, normalize)
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    candidates = np.flatnonzero(pd.Series(hashes).duplicated(keep=False).to_numpy())
+    mask = np.zeros(len(df), dtype=bool)
+    if len(candidates):
+        mask[candidates] = keys.iloc[candidates].duplicated().to_numpy()
+    return mask
+
+
+# Number of duplicate rows, without building the duplicate frame
+def count_duplicates(df, subset=None, normalize=False):
+    return int(duplicated_mask(df, subset, normalize).sum())
+
+
+# Keep the first occurrence of every row (or of every key when subset is given)
+def drop_duplicates(df, subset=None, normalize=False):
+    mask = duplicated_mask(df, subset, normalize)
+    if not mask.any():
+        return df
+    return df[~mask]
+
+
+# Incremental de-duplication across chunks. Hashes of every row kept so far are held in
+# one sorted uint64 array (8 bytes per unique row), so arbitrarily large inputs can be
+# streamed through filter() chunk by chunk. Earlier rows are not kept, so a match is decided
+# on the 64-bit hash alone: two distinct rows colliding (about 1 in 10**19 per pair) or
+# differing only in type within an object column (1 vs "1"; a CSV column parses to one
+# type per chunk) are treated as duplicates.
+class Deduplicator:
+    def __init__(self, subset=None, normalize=False):
+        self.subset = subset
+        self.normalize = normalize
+        self.seen = np.empty(0, dtype=np.uint64)
+        self.rows = 0
+        self.duplicates = 0
+
+    # Return the rows of this chunk not seen in this or any earlier chunk
+    def filter(self, chunk):
+        hashes = row_hashes(chunk, self.subset, self.normalize, widen_numeric=True)
+        keep = ~pd.Series(hashes).duplicated().to_numpy()
+        if len(self.seen):
+            positions = np.searchsorted(self.seen, hashes)
+            positions[positions == len(self.seen)] = 0
+            keep &= self.seen[positions] != hashes
+
+        new = hashes[keep]
+        if len(new):
+            self.seen = np.sort(np.concatenate([self.seen, new]), kind="stable")
+        self.rows += len(chunk)
+        self.duplicates += int(len(chunk) - keep.sum())
+        return chunk[keep]
+
+    def stats(self):
+        return {"rows": self.rows, "unique": self.rows - self.duplicates, "duplicates": self.duplicates}
+
+
+# Stream a CSV through a Deduplicator and append the unique rows to `output`
+def dedupe_csv(source, output, subset=None, normalize=False, chunksize=200_000):
+    deduplicator = Deduplicator(subset, normalize)
+    header = True
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        deduplicator.filter(chunk).to_csv(output, mode="w" if header else "a", header=header, index=False)
+        header = False
+    return deduplicator.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remove duplicate rows from a CSV file, streaming it in chunks.")
+    parser.add_argument("input", help="CSV file to de-duplicate")
+    parser.add_argument("output", help="where to write the unique rows")
+    parser.add_argument("--subset", nargs="+", default=None, help="key columns (default: all columns)")
+    parser.add_argument("--near", action="store_true", help="ignore case and extra whitespace in text columns")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="rows per chunk (default: 200000)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = dedupe_csv(args.input, args.output, args.subset, args.near, args.chunksize)
+    print(
+        f"{stats['rows']} rows, {stats['duplicates']} duplicates removed, {stats['unique']} written "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+import jobs
+
+
+# Refuse one-hot encodings that would produce more output columns than this
+MAX_OUTPUT_COLUMNS = 1000
+# Label for the bucket that collects values outside the top-K categories; columns that already
+# hold this value are refused, so a decoded bucket is never mistaken for a real value
+OTHER_LABEL = "__other__"
+# Sparse storage per stored value: one uint8 plus one int32 index
+SPARSE_BYTES_PER_VALUE = 5
+
+
+# Output size of a one-hot encoding before running it: distinct values per column,
+# output column count and estimated dense and sparse byte sizes. A category column gets an
+# indicator for every category, used or not, so its categories are counted instead.
+def estimate_one_hot(df, columns, top_k=None):
+    rows = len(df)
+    per_column = {}
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            distinct = len(df[col].cat.categories)
+        else:
+            distinct = int(df[col].nunique(dropna=True))
+        if top_k and distinct > top_k:
+            output_columns = top_k + 1
+        else:
+            output_columns = distinct
+        per_column[col] = {"distinct": distinct, "output_columns": output_columns}
+    total = sum(info["output_columns"] for info in per_column.values())
+    return {
+        "rows": rows,
+        "columns": per_column,
+        "output_columns": total,
+        "dense_bytes": rows * total,
+        "sparse_bytes": rows * len(columns) * SPARSE_BYTES_PER_VALUE,
+    }
+
+
+# Categorical view of a column keeping only its top_k most frequent values;
+# every other non-missing value is folded into the "other" bucket
+def _bucket_top_k(series, top_k, other_label):
+    cat = series.astype("category")
+    if not top_k or len(cat.cat.categories) <= top_k:
+        return cat
+    if other_label in cat.cat.categories:
+        raise ValueError(
+            f"Column '{series.name}' already contains the value '{other_label}', which labels the bucket "
+            "of values outside the top K; keep all categories for this column instead."
+        )
+    kept = cat.value_counts(sort=True).index[:top_k].tolist()
+    bucketed = cat.cat.set_categories(kept + [other_label])
+    return bucketed.mask(cat.notna() & bucketed.isna(), other_label)
+
+
+# One-hot encode the selected columns into sparse uint8 indicator columns.
+# Returns the encoded frame and the mapping needed to decode it.
+def one_hot_encode(df, columns, top_k=None, other_label=OTHER_LABEL, sparse=True, max_columns=MAX_OUTPUT_COLUMNS):
+    estimate = estimate_one_hot(df, columns, top_k)
+    if estimate["output_columns"] > max_columns:
+        raise ValueError(
+            f"One-hot encoding would create {estimate['output_columns']} columns "
+            f"(~{estimate['dense_bytes'] / 1024 ** 2:.0f} MB dense); limit is {max_columns}. "
+            "Keep only the top K categories or choose fewer columns."
+        )
+
+    bucketed = df.copy(deep=False)
+    mapping = {"method": "one_hot", "columns": {}}
+    for number, col in enumerate(columns):
+        jobs.report(0.5 * number / len(columns), f"bucketing {col}")
+        bucketed[col] = _bucket_top_k(df[col], top_k, other_label)
+        categories = bucketed[col].cat.categories.tolist()
+        mapping["columns"][col] = {
+            "categories": categories,
+            "dummy_columns": [f"{col}_{category}" for category in categories],
+        }
+
+    jobs.report(0.5, "building indicator columns")
+    encoded = pd.get_dummies(bucketed, columns=columns, sparse=sparse, dtype=np.uint8)
+    return encoded, mapping
+
+
+# Replace the selected columns with their categorical codes in one pass (missing values become -1).
+# Codes match sklearn's LabelEncoder ordering. Returns the encoded frame and the decoding mapping.
+def label_encode(df, columns):
+    categoricals = {col: df[col].astype("category") for col in columns}
+    encoded = df.copy(deep=False)
+    for col, cat in categoricals.items():
+        encoded[col] = cat.cat.codes
+    mapping = {
+        "method": "label",
+        "columns": {col: cat.cat.categories.tolist() for col, cat in categoricals.items()},
+    }
+    return encoded, mapping
+
+
+# Restore the original values from a frame encoded by one_hot_encode or label_encode.
+# Values folded into the "other" bucket decode to the bucket label. A malformed mapping
+# raises ValueError, like a mapping that does not fit the frame.
+def decode(df, mapping):
+    try:
+        return _decode(df, mapping)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed encoding mapping ({type(e).__name__}: {e})") from e
+
+
+def _decode(df, mapping):
+    decoded = df.copy(deep=False)
+    if mapping["method"] == "label":
+        for col, categories in mapping["columns"].items():
+            if col not in decoded.columns:
+                raise ValueError(f"Encoded column '{col}' not found.")
+            codes = decoded[col].fillna(-1).astype(np.int64)
+            decoded[col] = pd.Categorical.from_codes(codes, categories=categories)
+    elif mapping["method"] == "one_hot":
+        for col, info in mapping["columns"].items():
+            dummy_columns = info["dummy_columns"]
+            missing = [c for c in dummy_columns if c not in decoded.columns]
+            if missing:
+                raise ValueError(f"Encoded columns for '{col}' not found: {', '.join(missing[:5])}")
+            values = np.column_stack([np.asarray(decoded[c], dtype=np.uint8) for c in dummy_columns])
+            codes = np.where(values.any(axis=1), values.argmax(axis=1), -1)
+            position = decoded.columns.get_loc(dummy_columns[0])
+            decoded = decoded.drop(columns=dummy_columns)
+            decoded.insert(position, col, pd.Categorical.from_codes(codes, categories=info["categories"]))
+    else:
+        raise ValueError(f"Unknown encoding method: {mapping['method']}")
+    return decoded
+
+
+def mapping_to_json(mapping):
+    return json.dumps(mapping, indent=2, default=str)
+
+
+def mapping_from_json(text):
+    mapping = json.loads(text)
+    if "method" not in mapping or "columns" not in mapping:
+        raise ValueError("Not an encoding mapping file.")
+    return mapping
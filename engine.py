@@ -0,0 +1,134 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import ingest
+import pipeline
+
+
+# Apply every step of a plan to a DataFrame without the per-step cache used by the UI
+def clean_frame(df, plan):
+    for step in plan.steps:
+        df = step.apply(df)
+    return df
+
+
+# Expand directories and glob patterns into a sorted list of CSV paths
+def expand_inputs(inputs):
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.update(glob.glob(os.path.join(item, "*.csv")))
+        else:
+            paths.update(glob.glob(item))
+    return sorted(paths)
+
+
+# Output path for every input: its path relative to the inputs' common folder, under out_dir,
+# so files with the same name in different folders stay apart. Raises ValueError when an output
+# would overwrite an input (e.g. out_dir is the input folder).
+def output_paths(paths, out_dir):
+    inputs = [os.path.realpath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in inputs])
+    outputs = {path: os.path.join(out_dir, os.path.relpath(real, root)) for path, real in zip(paths, inputs)}
+    overwritten = sorted(path for path in outputs.values() if os.path.realpath(path) in set(inputs))
+    if overwritten:
+        raise ValueError(f"Cleaned files would overwrite inputs ({', '.join(overwritten)}); choose another --out-dir.")
+    return outputs
+
+
+# Load, clean and write one file. Runs inside a worker process, so it only takes
+# picklable arguments and reports failures in the result instead of raising.
+def clean_file(path, plan_json, output, optimize=False):
+    result = {"file": path, "rows_in": None, "rows_out": None, "output": None, "error": None}
+    try:
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            data = f.read()
+        if optimize:
+            df, _ = ingest.read_csv_optimized(data)
+        else:
+            df = pd.read_csv(path)
+        loaded = time.perf_counter()
+
+        cleaned = clean_frame(df, pipeline.CleaningPlan.from_json(plan_json))
+        done = time.perf_counter()
+
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        cleaned.to_csv(output, index=False)
+        written = time.perf_counter()
+
+        result.update(
+            rows_in=len(df),
+            rows_out=len(cleaned),
+            output=output,
+            load_seconds=loaded - started,
+            clean_seconds=done - loaded,
+            write_seconds=written - done,
+            seconds=written - started,
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+# Clean many files in parallel across a process pool, yielding each result as it finishes
+def clean_files(plan, paths, out_dir, workers=None, optimize=False):
+    outputs = output_paths(paths, out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    plan_json = plan.to_json(indent=None)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(clean_file, path, plan_json, outputs[path], optimize) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a saved cleaning plan to many CSV files in parallel.")
+    parser.add_argument("plan", help="cleaning plan JSON exported from the Data Cleaning page")
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("-o", "--out-dir", default="cleaned", help="directory for cleaned files (default: cleaned)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--optimize", action="store_true", help="use the chunked, dtype-optimizing loader")
+    args = parser.parse_args(argv)
+
+    with open(args.plan, encoding="utf-8") as f:
+        plan = pipeline.CleaningPlan.from_json(f.read())
+    paths = expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no input files matched")
+    try:
+        output_paths(paths, args.out_dir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    failed = 0
+    rows_in = rows_out = 0
+    for result in clean_files(plan, paths, args.out_dir, args.workers, args.optimize):
+        if result["error"]:
+            failed += 1
+            print(f"FAILED {result['file']}: {result['error']}", file=sys.stderr)
+            continue
+        rows_in += result["rows_in"]
+        rows_out += result["rows_out"]
+        print(
+            f"{result['file']}: {result['rows_in']} -> {result['rows_out']} rows in {result['seconds']:.2f}s "
+            f"(load {result['load_seconds']:.2f}s, clean {result['clean_seconds']:.2f}s, "
+            f"write {result['write_seconds']:.2f}s)"
+        )
+
+    print(
+        f"Processed {len(paths) - failed}/{len(paths)} files, {rows_in} -> {rows_out} rows "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import ingest
+
+
+# Rows converted and written at a time, so exporting never builds a second full copy of the frame
+EXPORT_ROWS = 100_000
+
+# Download formats: file extension -> MIME type
+FORMATS = {
+    "csv": "text/csv",
+    "csv.gz": "application/gzip",
+    "csv.zst": "application/zstd",
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+CSV_COMPRESSION = {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}
+
+
+# Arrow schema of the whole frame, so slices where a column happens to be all missing still
+# match it; sparse columns map to their dense value type
+def _schema(df):
+    sparse = [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+    schema = pa.Schema.from_pandas(df.drop(columns=sparse), preserve_index=False)
+    if not sparse:
+        return schema
+    fields = {field.name: field for field in schema}
+    return pa.schema([
+        pa.field(str(col), pa.from_numpy_dtype(df[col].dtype.subtype)) if col in sparse else fields[str(col)]
+        for col in df.columns
+    ])
+
+
+def _slices(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield ingest.densify(df.iloc[start:start + chunk_rows])
+
+
+# Write df to the pyarrow output stream `sink` in `fmt`, one slice of rows at a time:
+# CSV text through a streaming gzip/zstd compressor, Parquet as one row group per slice,
+# Feather as one record batch per slice
+def write_frame(df, fmt, sink, chunk_rows=EXPORT_ROWS):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    if fmt in CSV_COMPRESSION:
+        compression = CSV_COMPRESSION[fmt]
+        stream = pa.CompressedOutputStream(sink, compression) if compression else sink
+        stream.write(df.iloc[:0].to_csv(index=False).encode("utf-8"))
+        for chunk in _slices(df, chunk_rows):
+            stream.write(chunk.to_csv(index=False, header=False).encode("utf-8"))
+        if compression:
+            stream.close()
+        return
+
+    schema = _schema(df)
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+    with writer:
+        for chunk in _slices(df, chunk_rows):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# Serialize df for download; returns the file bytes and the seconds spent serializing
+def to_bytes(df, fmt, chunk_rows=EXPORT_ROWS):
+    started = time.perf_counter()
+    sink = pa.BufferOutputStream()
+    write_frame(df, fmt, sink, chunk_rows)
+    data = sink.getvalue().to_pybytes()
+    return data, time.perf_counter() - started
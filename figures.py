@@ -0,0 +1,61 @@
+import io
+import os
+import threading
+import time
+
+from matplotlib.figure import Figure
+
+import ingest
+import jobs
+
+
+# Memory budget for rendered chart images (override with ANALYSIS_FIGURE_CACHE_MB)
+FIGURE_CACHE_BYTES = int(os.environ.get("ANALYSIS_FIGURE_CACHE_MB", "256")) * 1024 * 1024
+# Resolution of rendered PNGs
+DPI = 150
+
+# Rendered PNG bytes plus the draw function's info dict, keyed by
+# (data fingerprint, chart type, columns, options)
+figure_cache = ingest.DataFrameCache(FIGURE_CACHE_BYTES, sizeof=lambda entry: len(entry[0]))
+
+_lock = threading.Lock()
+_metrics = {"renders": 0, "render_seconds": 0.0, "last_render_seconds": 0.0}
+
+
+# Return the PNG for a chart, drawing it only on a cache miss. draw(ax) populates the axes
+# and may return a dict of render details, which is cached and returned with the image.
+# Figures are created without pyplot, so they are never registered in its global figure
+# list and are freed as soon as the image has been saved.
+def render(key, draw, figsize=None):
+    entry = figure_cache.get(key)
+    if entry is not None:
+        return entry
+
+    started = time.perf_counter()
+    fig = Figure(figsize=figsize)
+    try:
+        jobs.report(0.0, "drawing")
+        result = draw(fig.subplots())
+        jobs.report(0.7, "saving image")
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=DPI, bbox_inches="tight")
+    finally:
+        fig.clear()
+    elapsed = time.perf_counter() - started
+
+    entry = (buffer.getvalue(), result if isinstance(result, dict) else None)
+    figure_cache.put(key, entry)
+    with _lock:
+        _metrics["renders"] += 1
+        _metrics["render_seconds"] += elapsed
+        _metrics["last_render_seconds"] = elapsed
+    return entry
+
+
+# Render counts and timings together with the image cache's hit/miss/eviction counters
+def stats():
+    with _lock:
+        metrics = dict(_metrics)
+    metrics["avg_render_seconds"] = metrics["render_seconds"] / metrics["renders"] if metrics["renders"] else 0.0
+    metrics.update(figure_cache.stats())
+    return metrics
@@ -0,0 +1,102 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+# One line of `python -X importtime` output: "import time: <self us> | <cumulative us> | <indented name>"
+LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+# Libraries the Home, Contact and Review pages should not need. pandas, numpy and pyarrow are
+# not listed: Streamlit imports them itself to inspect the arguments of option_menu.
+HEAVY_MODULES = ("matplotlib", "seaborn", "scipy", "sklearn")
+
+
+# Parse -X importtime output into one dict per imported module, in import order. Times are in
+# milliseconds; depth 0 marks modules imported directly rather than by another import.
+def parse(text):
+    entries = []
+    for line in text.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(indent) - 1) // 2,
+            })
+    return entries
+
+
+# Run a script (or import a list of modules) in a fresh interpreter under -X importtime.
+# Returns the parsed entries and the wall-clock seconds of the whole run.
+def measure(script=None, modules=None, python=sys.executable):
+    if script is not None:
+        command = [python, "-X", "importtime", os.path.basename(script)]
+        cwd = os.path.dirname(os.path.abspath(script))
+    else:
+        command = [python, "-X", "importtime", "-c", "import " + ", ".join(modules)]
+        cwd = None
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=cwd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    return parse(completed.stderr), elapsed
+
+
+def total_ms(entries):
+    return sum(entry["cumulative_ms"] for entry in entries if entry["depth"] == 0)
+
+
+# Directly imported modules that took the longest, with their cumulative time
+def slowest(entries, top=15):
+    top_level = [entry for entry in entries if entry["depth"] == 0]
+    return sorted(top_level, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top]
+
+
+# Which of `names` (top-level packages) were imported at all
+def imported(entries, names):
+    packages = {entry["module"].split(".")[0] for entry in entries}
+    return [name for name in names if name in packages]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Report where a cold start spends its import time, using python -X importtime."
+    )
+    parser.add_argument("script", nargs="?", default="app.py",
+                        help="script to run in a fresh interpreter (default: app.py, i.e. the Home page)")
+    parser.add_argument("--modules", nargs="+", default=None, help="import these modules instead of running a script")
+    parser.add_argument("--top", type=int, default=15, help="how many of the slowest imports to list (default: 15)")
+    parser.add_argument("--target-ms", type=float, default=None,
+                        help="exit with status 1 when the total import time exceeds this")
+    parser.add_argument("--forbid", nargs="*", default=None,
+                        help="exit with status 1 when any of these packages is imported "
+                             f"(no names: {' '.join(HEAVY_MODULES)})")
+    args = parser.parse_args(argv)
+
+    entries, elapsed = measure(None if args.modules else args.script, args.modules)
+    if not entries:
+        print("No -X importtime output; did the interpreter start?", file=sys.stderr)
+        return 2
+
+    total = total_ms(entries)
+    print(f"{len(entries)} modules imported in {total:.0f} ms; whole run took {elapsed:.2f}s")
+    for entry in slowest(entries, args.top):
+        print(f"{entry['cumulative_ms']:10.1f} ms  {entry['module']}")
+
+    status = 0
+    if args.target_ms is not None and total > args.target_ms:
+        print(f"Import time {total:.0f} ms is over the {args.target_ms:.0f} ms target")
+        status = 1
+    if args.forbid is not None:
+        found = imported(entries, args.forbid or HEAVY_MODULES)
+        if found:
+            print(f"Imported although not needed: {', '.join(found)}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
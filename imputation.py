@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+import profiling
+
+
+# Strategies for numeric and for other columns; "skip" leaves a column untouched
+NUMERIC_STRATEGIES = ("median", "mean", "mode", "max", "skip")
+CATEGORICAL_STRATEGIES = ("mode", "skip")
+
+
+# Plain Python value for JSON export (numpy scalars would otherwise be written as strings)
+def _native(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value
+
+
+# Fill value for every column with missing values: the per-dtype default strategy unless the
+# column has an override (a strategy name) or a constant. All statistics come from one
+# profiling.DatasetProfile pass, so fitting a 300-column frame does not scan it 300 times.
+def fit(df, numeric="median", categorical="mode", overrides=None, constants=None, profile=None):
+    if numeric not in NUMERIC_STRATEGIES:
+        raise ValueError(f"Unknown numeric strategy: {numeric}")
+    if categorical not in CATEGORICAL_STRATEGIES:
+        raise ValueError(f"Unknown categorical strategy: {categorical}")
+    overrides = overrides or {}
+    constants = constants or {}
+    profile = profiling.profile_frame(df) if profile is None else profile
+
+    values = {}
+    for col in profile.missing_columns():
+        if col in constants:
+            values[col] = _native(constants[col])
+            continue
+        is_numeric = profile.columns.at[col, "numeric"]
+        strategy = overrides.get(col, numeric if is_numeric else categorical)
+        allowed = NUMERIC_STRATEGIES if is_numeric else CATEGORICAL_STRATEGIES
+        if strategy not in allowed:
+            raise ValueError(f"Strategy '{strategy}' does not apply to column '{col}'.")
+        if strategy == "skip":
+            continue
+        value = profile.fill_value(col, strategy)
+        # Columns with no values at all have nothing to learn a fill value from
+        if value is not None and not pd.isna(value):
+            values[col] = _native(value)
+    return values
+
+
+# Fill every column in `values` with one frame-wide fillna. Fitted values can come from
+# another file; columns missing from this frame are ignored.
+def transform(df, values):
+    values = {col: value for col, value in values.items() if col in df.columns}
+    if not values:
+        return df
+    df = df.copy(deep=False)
+    for col, value in values.items():
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+            df[col] = series.cat.add_categories([value])
+    return df.fillna(values)
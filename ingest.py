@@ -0,0 +1,408 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Memory budget for parsed DataFrames kept between reruns (override with ANALYSIS_CACHE_MB)
+DEFAULT_CACHE_BYTES = int(os.environ.get("ANALYSIS_CACHE_MB", "1024")) * 1024 * 1024
+
+# Rows read up front to decide column dtypes before streaming the rest of the file
+SAMPLE_ROWS = 10_000
+# Rows per chunk when streaming a CSV through the optimizing loader
+CHUNK_ROWS = 200_000
+# Text columns whose distinct/total ratio in the sample is below this become category
+CATEGORY_RATIO = 0.5
+
+# Upload formats by file extension: (format, compression of the CSV text)
+FORMATS = {
+    ".csv": ("csv", None),
+    ".gz": ("csv", "gzip"),
+    ".zst": ("csv", "zstd"),
+    ".parquet": ("parquet", None),
+    ".feather": ("feather", None),
+    ".arrow": ("feather", None),
+}
+# Extensions accepted by the uploaders
+UPLOAD_TYPES = [ext[1:] for ext in FORMATS]
+# Uploads whose fingerprint and column names are remembered between reruns
+UPLOAD_ENTRIES = 256
+
+_uploads = OrderedDict()
+_uploads_lock = threading.Lock()
+
+
+# Bounded LRU cache of parsed DataFrames, sized by their in-memory footprint.
+# sizeof lets other byte-sized values (e.g. rendered images) share the same eviction logic.
+class DataFrameCache:
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES, sizeof=None):
+        self.max_bytes = max_bytes
+        self.sizeof = frame_bytes if sizeof is None else sizeof
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Load report stored alongside a cached frame (None if absent)
+    def report(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else None
+
+    def put(self, key, df, report=None):
+        size = self.sizeof(df)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            # A frame larger than the whole budget is returned to the caller but never kept
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (df, size, report)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# In-memory footprint of a DataFrame in bytes, including object payloads
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# Process-wide cache: shared by every rerun and every browser session
+default_cache = DataFrameCache()
+
+
+# Arrow cannot hold sparse columns (e.g. one-hot output), so they are densified before
+# the frame is written to an Arrow-based file
+def densify(df):
+    sparse = [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+    if not sparse:
+        return df
+    df = df.copy(deep=False)
+    for col in sparse:
+        df[col] = df[col].sparse.to_dense()
+    return df
+
+
+# Hash the raw uploaded bytes so identical files map to the same cache entry
+def file_fingerprint(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# What is known about one upload: its fingerprint, and its column names once listed. Streamlit
+# gives every upload its own file_id, so the bytes are copied and hashed once per upload
+# rather than on every rerun; objects without a file_id are hashed each time.
+def _upload_entry(uploaded_file):
+    file_id = getattr(uploaded_file, "file_id", None)
+    key = (file_id, uploaded_file.name, uploaded_file.size)
+    if file_id is not None:
+        with _uploads_lock:
+            entry = _uploads.get(key)
+            if entry is not None:
+                _uploads.move_to_end(key)
+                return entry
+    entry = {"fingerprint": file_fingerprint(uploaded_file.getvalue()), "columns": None}
+    if file_id is not None:
+        with _uploads_lock:
+            _uploads[key] = entry
+            while len(_uploads) > UPLOAD_ENTRIES:
+                _uploads.popitem(last=False)
+    return entry
+
+
+def upload_fingerprint(uploaded_file):
+    return _upload_entry(uploaded_file)["fingerprint"]
+
+
+# Text columns in the sample with few enough distinct values to store as category
+def infer_category_columns(sample, max_ratio=CATEGORY_RATIO):
+    rows = max(len(sample), 1)
+    columns = []
+    for col in sample.select_dtypes(include=["object", "string"]).columns:
+        if sample[col].nunique(dropna=True) / rows < max_ratio:
+            columns.append(col)
+    return columns
+
+
+# Downcast numerics and convert text columns of one chunk to compact dtypes
+def optimize_chunk(chunk, category_columns, string_dtype=False):
+    for col in chunk.columns:
+        series = chunk[col]
+        if col in category_columns:
+            chunk[col] = series.astype("category")
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            chunk[col] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            chunk[col] = pd.to_numeric(series, downcast="float")
+        elif string_dtype and (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            chunk[col] = series.astype(_string_dtype_name())
+    return chunk
+
+
+def _string_dtype_name():
+    try:
+        import pyarrow  # noqa: F401
+        return "string[pyarrow]"
+    except ImportError:
+        return "string"
+
+
+# dtype= mapping for the C parser pinning the sampled column types, so every chunk parses a
+# column the same way: integers as nullable Int64 (a later chunk may have missing values),
+# floats as float64 and text as the sample's text dtype. Boolean and all-missing columns are
+# left to inference.
+def _sample_dtypes(sample):
+    dtypes = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series) or series.isna().all():
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            dtypes[col] = "Int64"
+        elif pd.api.types.is_float_dtype(series):
+            dtypes[col] = "float64"
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            dtypes[col] = series.dtype
+    return dtypes
+
+
+# Stream a CSV as DataFrame chunks with the pandas C parser or pyarrow's streaming reader.
+# chunksize=None parses the whole file at once with the C parser, inferring types from all rows.
+def _iter_chunks(data, chunksize, engine, sample, columns=None):
+    if engine == "pyarrow":
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        # Pin column types from the sample so later blocks can't disagree with the first one
+        column_types = {}
+        for col in sample.columns:
+            if pd.api.types.is_integer_dtype(sample[col]):
+                column_types[col] = pa.int64()
+            elif pd.api.types.is_float_dtype(sample[col]):
+                column_types[col] = pa.float64()
+            elif pd.api.types.is_object_dtype(sample[col]) or pd.api.types.is_string_dtype(sample[col]):
+                column_types[col] = pa.string()
+        reader = pacsv.open_csv(
+            io.BytesIO(data),
+            read_options=pacsv.ReadOptions(block_size=64 * 1024 * 1024),
+            convert_options=pacsv.ConvertOptions(
+                column_types=column_types, strings_can_be_null=True, include_columns=list(sample.columns)
+            ),
+        )
+        for batch in reader:
+            yield batch.to_pandas()
+    elif chunksize is None:
+        yield pd.read_csv(io.BytesIO(data), usecols=columns)
+    else:
+        yield from pd.read_csv(io.BytesIO(data), chunksize=chunksize, usecols=columns, dtype=_sample_dtypes(sample))
+
+
+# Concatenate optimized chunks, aligning category columns on one shared set of categories
+def _concat_chunks(chunks, category_columns):
+    for col in category_columns:
+        categories = pd.Index(pd.unique(np.concatenate(
+            [chunk[col].cat.categories.to_numpy(dtype=object) for chunk in chunks]
+        )))
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+# Sample the file to infer dtypes, then stream it in chunks converting each one to
+# compact dtypes. columns, when given, limits parsing to those columns. Returns the DataFrame
+# and a report of the memory footprint before (default dtypes) and after optimization.
+def read_csv_optimized(data, chunksize=CHUNK_ROWS, sample_rows=SAMPLE_ROWS, engine="c", string_dtype=False, columns=None):
+    sample = pd.read_csv(io.BytesIO(data), nrows=sample_rows, usecols=columns)
+    category_columns = infer_category_columns(sample)
+
+    bytes_before = 0
+    chunks = []
+    try:
+        for chunk in _iter_chunks(data, chunksize, engine, sample, columns):
+            bytes_before += frame_bytes(chunk)
+            chunks.append(optimize_chunk(chunk, category_columns, string_dtype))
+    except (ImportError, ValueError):
+        if engine == "pyarrow":
+            # pyarrow rejects values that contradict the sampled types; the C parser widens instead
+            return read_csv_optimized(data, chunksize, sample_rows, "c", string_dtype, columns)
+        if chunksize is None:
+            raise
+        # A value past the sample contradicts its types (text in a numeric column): parse the
+        # file in one piece so each column's type is inferred from all of its rows
+        return read_csv_optimized(data, None, sample_rows, "c", string_dtype, columns)
+
+    if chunks:
+        df = _concat_chunks(chunks, category_columns)
+        # Integer columns were read as nullable Int64; without missing values they go back to
+        # plain NumPy integers, as the default loader returns them
+        for col in df.columns:
+            series = df[col]
+            if pd.api.types.is_integer_dtype(series) and pd.api.types.is_extension_array_dtype(series) and not series.hasnans:
+                df[col] = series.astype(series.dtype.numpy_dtype)
+    else:
+        df = optimize_chunk(sample, category_columns, string_dtype)
+
+    report = {
+        "rows": len(df),
+        "engine": engine,
+        "bytes_before": bytes_before,
+        "bytes_after": frame_bytes(df),
+        "category_columns": category_columns,
+        "dtypes": {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+    }
+    return df, report
+
+
+# Format and CSV compression of an uploaded file, from its extension
+def detect_format(name):
+    ext = os.path.splitext(name.lower())[1]
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file type '{ext or name}'; upload one of: {', '.join(UPLOAD_TYPES)}.")
+    return FORMATS[ext]
+
+
+# File name without its upload extension ("sales.csv.gz" -> "sales")
+def file_stem(name):
+    stem, ext = os.path.splitext(name)
+    if ext.lower() not in FORMATS:
+        return name
+    if ext.lower() in (".gz", ".zst") and stem.lower().endswith(".csv"):
+        stem = stem[:-len(".csv")]
+    return stem
+
+
+# Decompress gzip or zstd CSV bytes with pyarrow's codecs
+def _decompress(data, compression):
+    import pyarrow as pa
+
+    return pa.input_stream(pa.py_buffer(data), compression=compression).read()
+
+
+# Column names of an uploaded file, read from the Parquet/Feather schema or the CSV header
+# without parsing the data, once per upload
+def list_columns(uploaded_file):
+    entry = _upload_entry(uploaded_file)
+    if entry["columns"] is None:
+        entry["columns"] = _read_columns(uploaded_file)
+    return list(entry["columns"])
+
+
+def _read_columns(uploaded_file):
+    import pyarrow as pa
+
+    data = uploaded_file.getvalue()
+    fmt, compression = detect_format(uploaded_file.name)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        names = pq.read_schema(pa.BufferReader(data)).names
+        return [name for name in names if not name.startswith("__index_level_")]
+    if fmt == "feather":
+        return pa.ipc.open_file(pa.BufferReader(data)).schema.names
+    source = pa.input_stream(pa.py_buffer(data), compression=compression) if compression else io.BytesIO(data)
+    return pd.read_csv(source, nrows=0).columns.tolist()
+
+
+# Parse one file in any upload format; only `columns` are read when given
+def read_file(data, fmt, compression=None, columns=None, optimize=False, engine="c", string_dtype=False):
+    columns = list(columns) if columns else None
+    if fmt == "csv":
+        if compression:
+            data = _decompress(data, compression)
+        if optimize:
+            return read_csv_optimized(data, engine=engine, string_dtype=string_dtype, columns=columns)
+        return pd.read_csv(io.BytesIO(data), usecols=columns), {}
+
+    if fmt == "parquet":
+        df = pd.read_parquet(io.BytesIO(data), columns=columns)
+    else:
+        df = pd.read_feather(io.BytesIO(data), columns=columns)
+    if not optimize:
+        return df, {}
+    # Columnar files already carry their dtypes; only the compaction step applies
+    bytes_before = frame_bytes(df)
+    category_columns = infer_category_columns(df.head(SAMPLE_ROWS))
+    df = optimize_chunk(df.copy(deep=False), category_columns, string_dtype)
+    report = {
+        "engine": "pyarrow",
+        "bytes_before": bytes_before,
+        "bytes_after": frame_bytes(df),
+        "category_columns": category_columns,
+        "dtypes": {str(col): str(dtype) for col, dtype in df.dtypes.items()},
+    }
+    return df, report
+
+
+# Parse an uploaded CSV (plain, gzip or zstd), Parquet or Feather file once and serve later
+# reruns from the cache. columns limits the read to those columns; with optimize=True the
+# data goes through the dtype-optimizing loader. Returns the DataFrame and a key identifying
+# the uploaded bytes and loader options. The load report records the parse time. A rerun
+# served from the cache never touches the uploaded bytes.
+def load_file(uploaded_file, optimize=False, engine="c", string_dtype=False, columns=None, cache=None):
+    cache = default_cache if cache is None else cache
+    fmt, compression = detect_format(uploaded_file.name)
+    fingerprint = upload_fingerprint(uploaded_file)
+    if columns:
+        fingerprint = f"{fingerprint}:columns:{file_fingerprint(repr(list(columns)).encode())}"
+    if optimize:
+        fingerprint = f"{fingerprint}:optimized:{engine}:{int(string_dtype)}"
+
+    df = cache.get(fingerprint)
+    if df is None:
+        started = time.perf_counter()
+        data = uploaded_file.getvalue()
+        df, report = read_file(data, fmt, compression, columns, optimize, engine, string_dtype)
+        report.update({
+            "format": f"{fmt} ({compression})" if compression else fmt,
+            "file_bytes": len(data),
+            "rows": len(df),
+            "parse_seconds": time.perf_counter() - started,
+        })
+        cache.put(fingerprint, df, report)
+
+    # Shallow copy so column assignments on the page never leak into the cached frame
+    return df.copy(deep=False), fingerprint
+
+
+# Load report recorded when a dataset was parsed: format, size and parse time, plus the
+# memory footprint before and after optimization when loaded with optimize=True
+def load_report(fingerprint, cache=None):
+    cache = default_cache if cache is None else cache
+    return cache.report(fingerprint)
@@ -0,0 +1,257 @@
+import cProfile
+import io
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+
+# Structured performance log, one JSON line per rerun (override with ANALYSIS_PERF_LOG; empty disables it)
+LOG_PATH = os.environ.get("ANALYSIS_PERF_LOG", "performance.log")
+LOG_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+# Reruns kept in memory for the performance panel, across all sessions
+RECENT_RUNS = 200
+# Lines of cProfile output kept for a profiled rerun
+PROFILE_LINES = 40
+
+_local = threading.local()
+_recent = deque(maxlen=RECENT_RUNS)
+_recent_lock = threading.Lock()
+_run_ids = itertools.count(1)
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = logging.getLogger("analysis.performance")
+            _logger.propagate = False
+            _logger.setLevel(logging.INFO)
+            if LOG_PATH:
+                handler = logging.handlers.RotatingFileHandler(
+                    LOG_PATH, maxBytes=LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+                )
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                _logger.addHandler(handler)
+        return _logger
+
+
+# Python-level allocation tracing for the peak-memory column of every span. Off by default,
+# since tracemalloc slows allocation-heavy code down noticeably (ANALYSIS_TRACE_MEMORY=1 turns
+# it on at startup). The peak is process-wide, so it also counts other sessions and jobs.
+def trace_memory(enabled):
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def tracing_memory():
+    return tracemalloc.is_tracing()
+
+
+if os.environ.get("ANALYSIS_TRACE_MEMORY") == "1":
+    trace_memory(True)
+
+
+# One timed stage of a rerun. rows and bytes describe the data it worked on; any other fields
+# (a chart type, a column name) are kept as they are.
+class Span:
+    def __init__(self, name, depth, fields):
+        self.name = name
+        self.depth = depth
+        self.fields = fields
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.peak_bytes = None
+        self._peak_seen = 0
+        self._memory_start = None
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    # Record the row count and (shallow) in-memory size of a DataFrame
+    def frame(self, df, prefix=""):
+        self.fields[f"{prefix}rows"] = len(df)
+        self.fields[f"{prefix}bytes"] = int(df.memory_usage(index=True, deep=False).sum())
+
+    def to_dict(self, run_started):
+        record = {
+            "name": self.name,
+            "depth": self.depth,
+            "offset": round(self.started - run_started, 6),
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "peak_mb": round(self.peak_bytes / 1024 ** 2, 3) if self.peak_bytes is not None else None,
+        }
+        record.update(self.fields)
+        return record
+
+
+# Stand-in handed out when no rerun is being recorded, so spans cost nothing outside the app
+class _NoSpan:
+    def set(self, **fields):
+        pass
+
+    def frame(self, df, prefix=""):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+# Spans recorded during one rerun of the script
+class Run:
+    def __init__(self, page, profile=False):
+        self.id = next(_run_ids)
+        self.page = page
+        self.fields = {}
+        self.created = time.time()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.status = "running"
+        self.spans = []
+        self.stack = []
+        self.profile_text = None
+        self._profiler = cProfile.Profile() if profile else None
+
+    def to_dict(self):
+        record = {
+            "run": self.id,
+            "time": self.created,
+            "page": self.page,
+            "status": self.status,
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "memory_traced": tracemalloc.is_tracing(),
+            "spans": [span.to_dict(self.started) for span in self.spans],
+        }
+        record.update(self.fields)
+        if self.profile_text is not None:
+            record["profile"] = self.profile_text
+        return record
+
+
+def current_run():
+    return getattr(_local, "run", None)
+
+
+# Record one rerun: every span opened in this thread until the block exits is collected, then
+# the run goes to the recent-runs buffer and the log file. st.stop() and st.rerun() end a run
+# early with an exception that is recorded as the run's status and passed on. With profile=True
+# the rerun also runs under cProfile (this thread only; background jobs are not included).
+@contextmanager
+def rerun(page, profile=False):
+    run = Run(page, profile)
+    _local.run = run
+    if run._profiler is not None:
+        run._profiler.enable()
+    try:
+        yield run
+        run.status = "ok"
+    except Exception as e:
+        run.status = f"error: {type(e).__name__}"
+        raise
+    except BaseException as e:
+        run.status = type(e).__name__
+        raise
+    finally:
+        if run._profiler is not None:
+            run._profiler.disable()
+            run.profile_text = _profile_text(run._profiler)
+        run.seconds = time.perf_counter() - run.started
+        _local.run = None
+        _finish(run)
+
+
+def _profile_text(profiler, lines=PROFILE_LINES):
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(lines)
+    return output.getvalue()
+
+
+def _finish(run):
+    with _recent_lock:
+        _recent.append(run)
+    try:
+        _get_logger().info(json.dumps(run.to_dict(), default=str))
+    except OSError:
+        pass
+
+
+# Extra fields for the current rerun, e.g. the section shown
+def annotate(**fields):
+    run = current_run()
+    if run is not None:
+        run.fields.update(fields)
+
+
+# Time a block of the current rerun (and its tracemalloc peak when tracing is on). Spans nest;
+# outside a recorded rerun this does nothing.
+@contextmanager
+def span(name, **fields):
+    run = current_run()
+    if run is None:
+        yield _NO_SPAN
+        return
+
+    current = Span(name, len(run.stack), fields)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        size, peak = tracemalloc.get_traced_memory()
+        if run.stack:
+            # The parent's peak so far, before the counter is reset for this span
+            run.stack[-1]._peak_seen = max(run.stack[-1]._peak_seen, peak)
+        tracemalloc.reset_peak()
+        current._memory_start = size
+        current._peak_seen = size
+    run.stack.append(current)
+    run.spans.append(current)
+    try:
+        yield current
+    finally:
+        run.stack.pop()
+        current.seconds = time.perf_counter() - current.started
+        if tracing and tracemalloc.is_tracing():
+            peak = max(current._peak_seen, tracemalloc.get_traced_memory()[1])
+            current.peak_bytes = peak - current._memory_start
+            if run.stack:
+                run.stack[-1]._peak_seen = max(run.stack[-1]._peak_seen, peak)
+
+
+# Recently recorded reruns, newest first
+def recent_runs(limit=None):
+    with _recent_lock:
+        runs = list(reversed(_recent))
+    return runs if limit is None else runs[:limit]
+
+
+# Per-span totals over the recent reruns: how often each span ran, its total, mean and
+# slowest time, the largest peak and the most rows it saw, slowest total first
+def span_summary(runs=None):
+    totals = {}
+    for run in recent_runs() if runs is None else runs:
+        for current in run.spans:
+            if current.seconds is None:
+                continue
+            entry = totals.setdefault(current.name, {"span": current.name, "count": 0, "total_seconds": 0.0,
+                                                     "max_seconds": 0.0, "max_peak_mb": None, "max_rows": None})
+            entry["count"] += 1
+            entry["total_seconds"] += current.seconds
+            entry["max_seconds"] = max(entry["max_seconds"], current.seconds)
+            if current.peak_bytes is not None:
+                entry["max_peak_mb"] = max(entry["max_peak_mb"] or 0.0, current.peak_bytes / 1024 ** 2)
+            if "rows" in current.fields:
+                entry["max_rows"] = max(entry["max_rows"] or 0, current.fields["rows"])
+    summary = sorted(totals.values(), key=lambda entry: entry["total_seconds"], reverse=True)
+    for entry in summary:
+        entry["mean_seconds"] = entry["total_seconds"] / entry["count"]
+    return summary
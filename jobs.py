@@ -0,0 +1,191 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+
+# Worker threads shared by every session (override with ANALYSIS_JOB_WORKERS). Threads rather
+# than processes: jobs work on large cached in-memory frames that a process pool would have to
+# pickle, and pandas/numpy release the GIL in their heavy kernels.
+JOB_WORKERS = int(os.environ.get("ANALYSIS_JOB_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Finished jobs remembered so a rerun can pick up their result. Results hold whole frames, so
+# besides the count they are bounded by their size (override with ANALYSIS_JOB_RESULTS_MB);
+# a result larger than the whole budget is handed to the waiting rerun but not kept.
+MAX_FINISHED = 16
+RESULT_BYTES = int(os.environ.get("ANALYSIS_JOB_RESULTS_MB", "512")) * 1024 * 1024
+
+_current = threading.local()
+
+
+# Approximate memory held by a job result: DataFrames (also inside tuples, lists and dicts)
+# are measured like the upload cache measures them, anything else by sys.getsizeof
+def result_bytes(result):
+    if isinstance(result, (tuple, list)):
+        return sum(result_bytes(item) for item in result)
+    if isinstance(result, dict):
+        return sum(result_bytes(item) for item in result.values())
+    if hasattr(result, "memory_usage") and hasattr(result, "columns"):
+        return int(result.memory_usage(index=True, deep=True).sum())
+    return sys.getsizeof(result)
+
+
+# Raised inside a job when cancellation was requested
+class Cancelled(Exception):
+    pass
+
+
+# One unit of background work. Status moves from queued to running and ends as done,
+# failed or cancelled; progress (0-1) and message are updated by the job itself.
+class Job:
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = ""
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.result_bytes = 0
+        self._cancel = threading.Event()
+
+    def report(self, progress=None, message=None):
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if self._cancel.is_set():
+            raise Cancelled(self.label)
+
+    # Ask the job to stop: a queued job never starts, a running one stops at its next report(),
+    # and the result of one that finishes anyway is discarded
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+            self.finished = time.time()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    # The job's return value; re-raises its exception if it failed
+    def result(self, timeout=None):
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            raise Cancelled(self.label) from None
+
+
+# Progress report from inside a running job; does nothing outside one. Also the point
+# where a cancelled job stops.
+def report(progress=None, message=None):
+    job = getattr(_current, "job", None)
+    if job is not None:
+        job.report(progress, message)
+
+
+# Runs jobs on a thread pool, keyed so that submitting the same work twice (e.g. on a
+# rerun while it is still in flight) returns the existing job instead of starting another
+class JobScheduler:
+    def __init__(self, workers=JOB_WORKERS, max_finished=MAX_FINISHED, max_result_bytes=RESULT_BYTES, sizeof=None):
+        self.max_finished = max_finished
+        self.max_result_bytes = max_result_bytes
+        self.sizeof = result_bytes if sizeof is None else sizeof
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Job for `key`, submitting fn(*args, **kwargs) unless it is queued, running, finished
+    # or cancelled already. Failed jobs are submitted again.
+    def submit(self, key, fn, *args, label="", **kwargs):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed":
+                self._jobs.move_to_end(key)
+                return job
+            job = Job(key, label)
+            self._jobs[key] = job
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+            self._trim()
+            return job
+
+    def _run(self, job, fn, args, kwargs):
+        _current.job = job
+        job.started = time.time()
+        job.status = "running"
+        try:
+            job.report()
+            result = fn(*args, **kwargs)
+            if job.cancelled():
+                raise Cancelled(job.label)
+        except Cancelled:
+            job.finished = time.time()
+            job.status = "cancelled"
+            self._drop(job)
+            raise
+        except BaseException:
+            job.finished = time.time()
+            job.status = "failed"
+            raise
+        finally:
+            _current.job = None
+        # Measured here, off the script thread, for the byte budget of finished jobs
+        job.result_bytes = self.sizeof(result)
+        job.finished = time.time()
+        job.progress = 1.0
+        job.status = "done"
+        with self._lock:
+            self._trim()
+        return result
+
+    # Cancelled jobs are not kept, so submitting their key again starts over
+    def _drop(self, job):
+        with self._lock:
+            if self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    # Drop a job so the next submit with its key starts fresh (cancels it if still running)
+    def forget(self, key):
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is not None and not job.done():
+            job.cancel()
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    # Keep at most max_finished finished jobs holding at most max_result_bytes, dropping the
+    # least recently used first; queued and running jobs are never dropped
+    def _trim(self):
+        finished = [job for job in self._jobs.values() if job.done()]
+        total = sum(job.result_bytes for job in finished)
+        for count, job in enumerate(finished):
+            if len(finished) - count <= self.max_finished and total <= self.max_result_bytes:
+                break
+            del self._jobs[job.key]
+            total -= job.result_bytes
+
+    def shutdown(self, wait=True):
+        for job in self.jobs():
+            job.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+# Scheduler shared by every session of the app
+default_scheduler = JobScheduler()
@@ -0,0 +1,23 @@
+import importlib
+
+
+# Stand-in for a module that is imported the first time one of its attributes is used, so a
+# page that never touches it never pays for importing it. The real import goes through
+# importlib (and its per-module locks), so the first use may come from any thread; nothing is
+# swapped into sys.modules and other modules importing the same name are unaffected.
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def loaded(self):
+        return self._module is not None
+
+    def __repr__(self):
+        state = "loaded" if self.loaded() else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
@@ -0,0 +1,233 @@
+import hashlib
+import json
+
+import pandas as pd
+
+import dedup
+import imputation
+import ingest
+import jobs
+import outliers
+
+
+# Step outputs kept between reruns, keyed by (input fingerprint, step params)
+step_cache = ingest.DataFrameCache()
+
+
+# Fill missing values in a column, registering the fill value as a category when needed
+def fill_column(series, value):
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+# Base class for one cleaning operation; params must be JSON-serializable.
+# apply() may be given the input's profiling.DatasetProfile to reuse its statistics.
+class Step:
+    name = None
+
+    def __init__(self, **params):
+        self.params = params
+
+    def apply(self, df, profile=None):
+        raise NotImplementedError
+
+    def to_dict(self):
+        return {"step": self.name, **self.params}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.params})"
+
+
+class DropColumns(Step):
+    name = "drop_columns"
+
+    def __init__(self, columns):
+        super().__init__(columns=list(columns))
+
+    def apply(self, df, profile=None):
+        return df.drop(columns=[col for col in self.params["columns"] if col in df.columns])
+
+
+class DropMissing(Step):
+    name = "drop_missing"
+
+    def __init__(self):
+        super().__init__()
+
+    def apply(self, df, profile=None):
+        return df.dropna()
+
+
+# Fill one column with its max, median, mode or mean, or with a fixed value
+class FillMissing(Step):
+    name = "fill_missing"
+    methods = ("max", "median", "mode", "mean", "value")
+
+    def __init__(self, column, method, value=None):
+        if method not in self.methods:
+            raise ValueError(f"Unknown fill method: {method}")
+        super().__init__(column=column, method=method, value=value)
+
+    def apply(self, df, profile=None):
+        column, method = self.params["column"], self.params["method"]
+        if column not in df.columns:
+            return df
+        has_missing = profile.columns.at[column, "nulls"] > 0 if profile is not None else df[column].isnull().any()
+        if not has_missing:
+            return df
+        series = df[column]
+        if method == "value":
+            value = self.params["value"]
+        elif profile is not None:
+            value = profile.fill_value(column, method)
+        elif method == "max":
+            value = series.max()
+        elif method == "median":
+            value = series.median()
+        elif method == "mode":
+            value = series.mode()[0]
+        else:
+            value = series.mean()
+        df = df.copy(deep=False)
+        df[column] = fill_column(series, value)
+        return df
+
+
+# Fill many columns at once with values fitted by imputation.fit. The fitted values are part
+# of the step, so replaying a saved plan on a new file reuses them instead of refitting.
+class ImputeMissing(Step):
+    name = "impute_missing"
+
+    def __init__(self, values):
+        super().__init__(values=dict(values))
+
+    def apply(self, df, profile=None):
+        return imputation.transform(df, self.params["values"])
+
+
+# Drop repeated rows, comparing only the key columns when subset is given and
+# ignoring case and extra whitespace in text columns when normalize is set
+class DropDuplicates(Step):
+    name = "drop_duplicates"
+
+    def __init__(self, subset=None, normalize=False):
+        super().__init__(subset=list(subset) if subset else None, normalize=normalize)
+
+    def apply(self, df, profile=None):
+        subset, normalize = self.params["subset"], self.params["normalize"]
+        if profile is not None and subset is None and not normalize and profile.duplicate_rows == 0:
+            return df
+        return dedup.drop_duplicates(df, subset, normalize)
+
+
+# Keep rows whose value lies within factor * IQR of the column's quartiles
+class RemoveOutliers(Step):
+    name = "remove_outliers"
+
+    def __init__(self, column, factor=1.5):
+        super().__init__(column=column, factor=factor)
+
+    def apply(self, df, profile=None):
+        column, factor = self.params["column"], self.params["factor"]
+        if profile is not None:
+            lower_bound, upper_bound = profile.iqr_bounds(column, factor)
+        else:
+            q1 = df[column].quantile(0.25)
+            q3 = df[column].quantile(0.75)
+            iqr = q3 - q1
+            lower_bound = q1 - factor * iqr
+            upper_bound = q3 + factor * iqr
+        return df[(df[column] >= lower_bound) & (df[column] <= upper_bound)]
+
+
+# Drop rows flagged as outliers across several numeric columns at once (IQR, z-score or MAD);
+# how="any" drops a row if any column flags it, how="all" only if all of them do
+class FilterOutliers(Step):
+    name = "filter_outliers"
+
+    def __init__(self, columns, method="iqr", threshold=None, how="any"):
+        if method not in outliers.METHODS:
+            raise ValueError(f"Unknown outlier method: {method}")
+        if threshold is None:
+            threshold = outliers.DEFAULT_THRESHOLDS[method]
+        super().__init__(columns=list(columns), method=method, threshold=threshold, how=how)
+
+    def apply(self, df, profile=None):
+        columns, method = self.params["columns"], self.params["method"]
+        threshold, how = self.params["threshold"], self.params["how"]
+        if profile is not None and method == "iqr":
+            bounds = pd.DataFrame(
+                [profile.iqr_bounds(col, threshold) for col in columns], index=columns, columns=["lower", "upper"]
+            )
+        else:
+            bounds = outliers.column_bounds(df, columns, method, threshold)
+        mask = outliers.outlier_mask(df, bounds, how)
+        return df[~mask] if mask.any() else df
+
+
+STEP_TYPES = {
+    cls.name: cls
+    for cls in (DropColumns, DropMissing, FillMissing, ImputeMissing, DropDuplicates, RemoveOutliers, FilterOutliers)
+}
+
+
+def step_from_dict(data):
+    params = dict(data)
+    name = params.pop("step")
+    if name not in STEP_TYPES:
+        raise ValueError(f"Unknown cleaning step: {name}")
+    return STEP_TYPES[name](**params)
+
+
+# Content fingerprint of a DataFrame that did not come from an upload
+def frame_fingerprint(df):
+    data = pd.util.hash_pandas_object(df).values.tobytes() + repr(list(df.columns)).encode()
+    return ingest.file_fingerprint(data)
+
+
+# Fingerprint of a step's output, derived from its input fingerprint and parameters
+def step_fingerprint(fingerprint, step):
+    payload = f"{fingerprint}|{json.dumps(step.to_dict(), sort_keys=True, default=str)}"
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+# Apply one step, reusing the cached output when the same step already ran on the same input.
+# profile, when given, is the input's DatasetProfile. Returns the output DataFrame and its fingerprint.
+def run_step(step, df, fingerprint, cache=None, profile=None):
+    cache = step_cache if cache is None else cache
+    out_fingerprint = step_fingerprint(fingerprint, step)
+    out = cache.get(out_fingerprint)
+    if out is None:
+        out = step.apply(df, profile)
+        cache.put(out_fingerprint, out)
+    return out.copy(deep=False), out_fingerprint
+
+
+# Ordered list of cleaning steps that can be exported to and replayed from JSON
+class CleaningPlan:
+    def __init__(self, steps=None):
+        self.steps = list(steps or [])
+
+    def add(self, step):
+        self.steps.append(step)
+        return step
+
+    def run(self, df, fingerprint=None, cache=None):
+        if fingerprint is None:
+            fingerprint = frame_fingerprint(df)
+        for number, step in enumerate(self.steps):
+            jobs.report(number / max(len(self.steps), 1), f"step {number + 1} of {len(self.steps)}: {step.name}")
+            df, fingerprint = run_step(step, df, fingerprint, cache)
+        return df, fingerprint
+
+    def to_json(self, indent=2):
+        return json.dumps({"steps": [step.to_dict() for step in self.steps]}, indent=indent, default=str)
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        return cls(step_from_dict(item) for item in data["steps"])
+
+    def __len__(self):
+        return len(self.steps)
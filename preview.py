@@ -0,0 +1,100 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+import instrument
+
+
+# Rows per preview page
+PAGE_ROWS = 100
+# Upper bound on the in-memory size of one rendered window (override with ANALYSIS_PREVIEW_KB)
+BYTE_BUDGET = int(os.environ.get("ANALYSIS_PREVIEW_KB", "2048")) * 1024
+
+
+# Densify sparse columns of a small window so it can be serialized for the browser
+def _densify(window):
+    sparse_columns = {col: dtype.subtype for col, dtype in window.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+    return window.astype(sparse_columns) if sparse_columns else window
+
+
+# Trim a window to the byte budget, keeping at least one row
+def _within_budget(window, byte_budget):
+    size = int(window.memory_usage(index=True, deep=True).sum())
+    if size <= byte_budget or len(window) <= 1:
+        return window
+    rows = max(1, int(len(window) * byte_budget / size))
+    return window.iloc[:rows]
+
+
+# Render one page of a DataFrame; only that window is sent to the browser.
+# rows optionally restricts the preview to a subset of index labels.
+def show_page(df, key, page_rows=PAGE_ROWS, byte_budget=BYTE_BUDGET, rows=None):
+    total = len(df) if rows is None else len(rows)
+    pages = max(1, -(-total // page_rows))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (page - 1) * page_rows
+    with instrument.span("preview", key=key, total_rows=total) as span:
+        if rows is None:
+            window = df.iloc[start:start + page_rows]
+        else:
+            window = df.loc[rows[start:start + page_rows]]
+        window = _within_budget(_densify(window), byte_budget)
+        span.frame(window)
+        st.dataframe(window)
+    if total:
+        st.caption(f"Rows {start + 1}-{start + len(window)} of {total}, {df.shape[1]} columns")
+    else:
+        st.caption(f"No rows, {df.shape[1]} columns")
+
+
+# Describe what a cleaning step changed: removed columns, removed rows (matched by index)
+# and rows whose missing values were filled
+def diff_summary(before, after):
+    removed_columns = [col for col in before.columns if col not in after.columns]
+    added_columns = [col for col in after.columns if col not in before.columns]
+    removed_rows = before.index.difference(after.index)
+
+    filled_rows = pd.Index([])
+    shared = [col for col in after.columns if col in before.columns]
+    if len(removed_rows) == 0 and shared:
+        # Only columns whose null count dropped need a row-level comparison
+        null_before = before[shared].isnull().sum()
+        null_after = after[shared].isnull().sum()
+        changed = [col for col in shared if null_after[col] < null_before[col]]
+        if changed:
+            mask = (before[changed].isnull() & after[changed].notnull()).any(axis=1)
+            filled_rows = after.index[mask.to_numpy()]
+
+    return {
+        "removed_columns": removed_columns,
+        "added_columns": added_columns,
+        "removed_rows": removed_rows,
+        "filled_rows": filled_rows,
+    }
+
+
+# Show a short summary of a step's effect plus a paged view of the affected rows only
+def show_changes(before, after, key, page_rows=PAGE_ROWS, byte_budget=BYTE_BUDGET):
+    with instrument.span("diff_summary", key=key) as span:
+        span.frame(before)
+        diff = diff_summary(before, after)
+    parts = [f"shape {before.shape} -> {after.shape}"]
+    if diff["removed_columns"]:
+        parts.append(f"removed columns: {', '.join(map(str, diff['removed_columns']))}")
+    if diff["added_columns"]:
+        parts.append(f"{len(diff['added_columns'])} new columns")
+    if len(diff["removed_rows"]):
+        parts.append(f"{len(diff['removed_rows'])} rows removed")
+    if len(diff["filled_rows"]):
+        parts.append(f"{len(diff['filled_rows'])} rows filled")
+    st.caption("Changes: " + "; ".join(parts))
+
+    if len(diff["removed_rows"]):
+        with st.expander("Removed rows"):
+            show_page(before, f"{key}_removed", page_rows, byte_budget, rows=diff["removed_rows"])
+    elif len(diff["filled_rows"]):
+        with st.expander("Filled rows"):
+            show_page(after, f"{key}_filled", page_rows, byte_budget, rows=diff["filled_rows"])
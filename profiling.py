@@ -0,0 +1,91 @@
+import pandas as pd
+
+import dedup
+import ingest
+import jobs
+
+
+# Per-column statistics of one dataset plus its row and duplicate-row counts
+class DatasetProfile:
+    def __init__(self, columns, rows, duplicate_rows):
+        self.columns = columns
+        self.rows = rows
+        self.duplicate_rows = duplicate_rows
+
+    def null_counts(self):
+        return self.columns["nulls"]
+
+    def missing_columns(self):
+        return self.columns.index[self.columns["nulls"] > 0].tolist()
+
+    def numeric_columns(self):
+        return self.columns.index[self.columns["numeric"]].tolist()
+
+    # Value used by FillMissing for the max/median/mode/mean methods
+    def fill_value(self, column, method):
+        return self.columns.at[column, method]
+
+    # Bounds used by RemoveOutliers: factor * IQR beyond the quartiles
+    def iqr_bounds(self, column, factor=1.5):
+        q1, q3 = self.columns.at[column, "q1"], self.columns.at[column, "q3"]
+        iqr = q3 - q1
+        return q1 - factor * iqr, q3 + factor * iqr
+
+
+# Most frequent value; ties resolve to the smallest value, as Series.mode()[0] does
+def _mode(counts):
+    if counts.empty:
+        return None
+    top = counts.index[counts.to_numpy() == counts.iloc[0]]
+    try:
+        return top.min()
+    except TypeError:
+        return top[0]
+
+
+# Compute every per-column statistic the cleaning page needs, with frame-wide vectorized
+# reductions for nulls, min/max/mean and quartiles, one value_counts per column for
+# distinct count and mode, and one row-hash pass for duplicates
+def profile_frame(df):
+    numeric = df.select_dtypes(include="number")
+    stats = pd.DataFrame(index=df.columns)
+    stats["dtype"] = df.dtypes.astype(str)
+    stats["numeric"] = [col in numeric.columns for col in df.columns]
+    stats["nulls"] = df.isnull().sum()
+
+    if not numeric.columns.empty:
+        summary = numeric.agg(["min", "max", "mean"]).T
+        quartiles = numeric.quantile([0.25, 0.5, 0.75]).T
+        quartiles.columns = ["q1", "median", "q3"]
+        stats = stats.join(summary).join(quartiles)
+    else:
+        for name in ("min", "max", "mean", "q1", "median", "q3"):
+            stats[name] = float("nan")
+
+    distinct, modes = [], []
+    for number, col in enumerate(df.columns):
+        jobs.report(0.2 + 0.6 * number / len(df.columns), "counting distinct values")
+        counts = df[col].value_counts(dropna=True)
+        # Category columns also list their unused categories, with a count of zero
+        counts = counts[counts > 0]
+        distinct.append(len(counts))
+        modes.append(_mode(counts))
+    stats["distinct"] = distinct
+    stats["mode"] = pd.Series(modes, index=df.columns, dtype=object)
+
+    jobs.report(0.8, "counting duplicate rows")
+    duplicate_rows = dedup.count_duplicates(df)
+    return DatasetProfile(stats, len(df), duplicate_rows)
+
+
+# Profiles are small, so the budget only bounds pathological very wide datasets
+profile_cache = ingest.DataFrameCache(64 * 1024 * 1024, sizeof=lambda profile: ingest.frame_bytes(profile.columns))
+
+
+# Profile of a dataset, computed once per fingerprint
+def get_profile(df, fingerprint):
+    profile = profile_cache.get(fingerprint)
+    if profile is None:
+        profile = profile_frame(df)
+        profile_cache.put(fingerprint, profile)
+    return profile
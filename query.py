@@ -0,0 +1,405 @@
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+import ingest
+import jobs
+
+try:
+    import duckdb
+except ImportError:  # optional: queries fall back to SQLite
+    duckdb = None
+
+
+# Server-side folder whose data files can be queried in place, e.g. files too large to upload
+# (ANALYSIS_DATA_DIR; unset hides the option)
+DATA_DIR = os.environ.get("ANALYSIS_DATA_DIR", "")
+# Uploaded files are written here once so they can be scanned like any other file; the least
+# recently used are deleted once the folder exceeds ANALYSIS_QUERY_UPLOAD_MB (default 2048)
+UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "analysis-query-uploads")
+UPLOAD_BYTES = int(os.environ.get("ANALYSIS_QUERY_UPLOAD_MB", "2048")) * 1024 * 1024
+# Memory DuckDB may use before spilling to its temp directory (override with ANALYSIS_QUERY_MB)
+MEMORY_LIMIT_MB = int(os.environ.get("ANALYSIS_QUERY_MB", "1024"))
+# Rows per streamed result batch, and result rows shown before saving
+BATCH_ROWS = 100_000
+PREVIEW_ROWS = 1_000
+
+DATASET_FORMATS = {"csv": "csv", "parquet": "parquet", "feather": "ipc"}
+COPY_BYTES = 16 * 1024 * 1024
+
+# Errors a bad query can raise, to be shown to the user
+QUERY_ERRORS = (sqlite3.Error, sqlite3.Warning, pa.ArrowException) + ((duckdb.Error,) if duckdb is not None else ())
+
+
+# Engines usable here, preferred first
+def available_engines():
+    return (["duckdb"] if duckdb is not None else []) + ["sqlite"]
+
+
+# Data files under DATA_DIR (relative paths), or none when it isn't configured
+def data_files(root=DATA_DIR):
+    if not root or not os.path.isdir(root):
+        return []
+    found = []
+    for folder, _, names in os.walk(root):
+        for name in names:
+            try:
+                ingest.detect_format(name)
+            except ValueError:
+                continue
+            found.append(os.path.relpath(os.path.join(folder, name), root))
+    return sorted(found)
+
+
+# Delete the least recently used files in `directory` until it fits max_bytes; `keep` (the
+# file just written or reused) is never deleted. Reusing a file touches it, and an upload
+# deleted while still chosen is written again on the next rerun.
+def _trim_uploads(directory, keep, max_bytes=UPLOAD_BYTES):
+    files = []
+    for name in os.listdir(directory):
+        # Files still being written belong to another thread
+        if name.endswith(".tmp"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        files.append((info.st_mtime, info.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+# Write a file into `directory` through `write(f)` unless it is there already, then keep the
+# folder within its budget
+def _cached_file(path, write, directory):
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    _trim_uploads(directory, keep=path)
+    return path
+
+
+# Plain copy of a compressed CSV that pyarrow datasets cannot read directly (zstd), streamed
+# to UPLOAD_DIR once per file version
+def _decompressed(path, compression, directory=UPLOAD_DIR):
+    info = os.stat(path)
+    key = ingest.file_fingerprint(f"{os.path.abspath(path)}|{info.st_size}|{info.st_mtime_ns}".encode())
+
+    def write(f):
+        with pa.input_stream(path, compression=compression) as source:
+            while True:
+                block = source.read(COPY_BYTES)
+                if not block:
+                    break
+                f.write(block)
+
+    return _cached_file(os.path.join(directory, f"{key}.csv"), write, directory)
+
+
+# Lazy, scannable view of a CSV (plain or compressed), Parquet or Feather file; nothing is read
+# until a query scans it, and then only the columns and row groups the query needs
+def open_dataset(path):
+    fmt, compression = ingest.detect_format(path)
+    if compression not in (None, "gzip"):
+        path = _decompressed(path, compression)
+    return ds.dataset(path, format=DATASET_FORMATS[fmt])
+
+
+# Path of an uploaded file's bytes on disk, written on first use and named after their hash
+# (computed once per upload, see ingest.upload_fingerprint)
+def save_upload(uploaded_file, directory=UPLOAD_DIR):
+    name = os.path.basename(uploaded_file.name)
+    ingest.detect_format(name)
+    # Keep the extensions, which say how the file is compressed
+    path = os.path.join(directory, ingest.upload_fingerprint(uploaded_file) + name[name.index("."):])
+    return _cached_file(path, lambda f: f.write(uploaded_file.getvalue()), directory)
+
+
+# SQL-friendly table name from a file or version name, unique among `taken`
+def table_name(name, taken=()):
+    base = re.sub(r"\W+", "_", ingest.file_stem(os.path.basename(name))).strip("_").lower() or "data"
+    if base[0].isdigit():
+        base = f"t_{base}"
+    candidate, number = base, 2
+    while candidate in taken:
+        candidate, number = f"{base}_{number}", number + 1
+    return candidate
+
+
+def _quote(identifier):
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+
+# DuckDB over registered Arrow datasets: scans stream from the files with column and filter
+# pushdown, and sorts or joins larger than memory_limit_mb spill to a temp directory. Once the
+# tables are registered, lock() cuts SQL off from the file system, so queries only see them.
+# Each query runs on its own cursor: a second query on a shared connection would silently end
+# the result stream of the first (e.g. a save still in progress).
+class DuckDBEngine:
+    name = "duckdb"
+
+    def __init__(self, memory_limit_mb=MEMORY_LIMIT_MB):
+        self._temp_dir = tempfile.TemporaryDirectory(prefix="analysis-query-")
+        self._con = duckdb.connect()
+        self._con.execute(f"SET memory_limit = '{int(memory_limit_mb)}MB'")
+        self._con.execute(f"SET temp_directory = '{self._temp_dir.name}'")
+        self._lock = threading.Lock()
+        self._datasets = {}
+        self._cursors = set()
+        self.tables = {}
+
+    def register(self, name, path):
+        dataset = open_dataset(path)
+        self._datasets[name] = dataset
+        self.tables[name] = dataset.schema
+
+    def lock(self):
+        with self._lock:
+            self._con.execute("SET enable_external_access = false")
+            self._con.execute("SET lock_configuration = true")
+
+    # Result of `sql` as a stream of record batches (a pyarrow RecordBatchReader); the query's
+    # cursor is closed once the stream is read to the end or closed
+    def execute(self, sql, batch_rows=BATCH_ROWS):
+        with self._lock:
+            cursor = self._con.cursor()
+            self._cursors.add(cursor)
+        try:
+            # Registered views belong to one cursor, so every cursor gets the tables
+            for name, dataset in self._datasets.items():
+                cursor.register(name, dataset)
+            result = cursor.execute(sql)
+            if hasattr(result, "to_arrow_reader"):
+                reader = result.to_arrow_reader(batch_rows)
+            else:
+                reader = result.fetch_record_batch(batch_rows)
+        except BaseException:
+            self._close_cursor(cursor)
+            raise
+
+        def batches():
+            try:
+                yield from reader
+            finally:
+                self._close_cursor(cursor)
+
+        return pa.RecordBatchReader.from_batches(reader.schema, batches())
+
+    def _close_cursor(self, cursor):
+        with self._lock:
+            self._cursors.discard(cursor)
+        cursor.close()
+
+    # Stop the queries running now; their readers raise instead of returning more rows
+    def interrupt(self):
+        with self._lock:
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            cursor.interrupt()
+
+    def close(self):
+        with self._lock:
+            for cursor in self._cursors:
+                cursor.close()
+            self._cursors.clear()
+            self._con.close()
+        self._temp_dir.cleanup()
+
+
+SQLITE_TYPES = [
+    (pa.types.is_boolean, "INTEGER"),
+    (pa.types.is_integer, "INTEGER"),
+    (pa.types.is_floating, "REAL"),
+]
+# Statements a query may run: reading tables and calling functions, nothing that writes or attaches
+SQLITE_READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+
+def _sqlite_type(arrow_type):
+    for matches, sqlite_type in SQLITE_TYPES:
+        if matches(arrow_type):
+            return sqlite_type
+    return "TEXT"
+
+
+# Values of one column as SQLite stores them: dates, timestamps, decimals and dictionary
+# columns become text
+def _sqlite_column(array):
+    if _sqlite_type(array.type) == "TEXT" and not pa.types.is_string(array.type):
+        array = pc.cast(array, pa.string())
+    return array.to_pylist()
+
+
+# Arrow array from one result column; SQLite columns may mix types, so anything pyarrow cannot
+# type as one column is returned as text
+def _result_array(values):
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([None if value is None else str(value) for value in values], pa.string())
+
+
+def _cast_batch(arrays, schema):
+    columns = []
+    for array, field in zip(arrays, schema):
+        if array.type != field.type:
+            array = array.cast(field.type) if not pa.types.is_null(array.type) else pa.nulls(len(array), field.type)
+        columns.append(array)
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+# Fallback engine without DuckDB: each table is copied batch by batch into a temporary on-disk
+# SQLite database, so memory stays bounded but every registered file is read once in full.
+# Queries run under an authorizer that only allows reads. Each query has its own cursor, which
+# SQLite steps independently of the others on the connection.
+class SQLiteEngine:
+    name = "sqlite"
+
+    def __init__(self):
+        self._temp_dir = tempfile.TemporaryDirectory(prefix="analysis-query-")
+        self._con = sqlite3.connect(os.path.join(self._temp_dir.name, "query.db"), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=OFF")
+        self._con.execute("PRAGMA synchronous=OFF")
+        self._lock = threading.Lock()
+        self.tables = {}
+
+    def register(self, name, path):
+        dataset = open_dataset(path)
+        schema = dataset.schema
+        columns = ", ".join(f"{_quote(field.name)} {_sqlite_type(field.type)}" for field in schema)
+        insert = f"INSERT INTO {_quote(name)} VALUES ({', '.join('?' * len(schema))})"
+        with self._lock:
+            self._con.execute(f"CREATE TABLE {_quote(name)} ({columns})")
+            for batch in dataset.to_batches(batch_size=BATCH_ROWS):
+                jobs.report(None, f"copying {name} into SQLite")
+                self._con.executemany(insert, zip(*[_sqlite_column(column) for column in batch.columns]))
+            self._con.commit()
+        self.tables[name] = schema
+
+    def lock(self):
+        pass
+
+    def interrupt(self):
+        self._con.interrupt()
+
+    def _authorize(self, action, *args):
+        return sqlite3.SQLITE_OK if action in SQLITE_READ_ACTIONS else sqlite3.SQLITE_DENY
+
+    # Result of `sql` as a RecordBatchReader; column types come from the first batch
+    def execute(self, sql, batch_rows=BATCH_ROWS):
+        with self._lock:
+            self._con.set_authorizer(self._authorize)
+            try:
+                cursor = self._con.execute(sql)
+            finally:
+                self._con.set_authorizer(None)
+        names = [column[0] for column in cursor.description or []]
+
+        def fetch():
+            with self._lock:
+                rows = cursor.fetchmany(batch_rows)
+            return [_result_array(list(values)) for values in zip(*rows)] if rows else None
+
+        first = fetch() or [pa.array([], pa.null()) for _ in names]
+        # Columns that are all NULL in the first batch are typed as text
+        schema = pa.schema([
+            pa.field(name, pa.string() if pa.types.is_null(array.type) else array.type)
+            for name, array in zip(names, first)
+        ])
+
+        def batches():
+            arrays = first
+            while arrays:
+                yield _cast_batch(arrays, schema)
+                arrays = fetch()
+
+        return pa.RecordBatchReader.from_batches(schema, batches())
+
+    def close(self):
+        with self._lock:
+            self._con.close()
+        self._temp_dir.cleanup()
+
+
+# Engine with `tables` ({table name: file path}) registered and locked
+def connect(tables, engine=None):
+    engine = engine or available_engines()[0]
+    if engine == "duckdb":
+        if duckdb is None:
+            raise ValueError("DuckDB is not installed; use the SQLite engine or `pip install duckdb`.")
+        connection = DuckDBEngine()
+    elif engine == "sqlite":
+        connection = SQLiteEngine()
+    else:
+        raise ValueError(f"Unknown query engine: {engine}")
+    try:
+        for name, path in tables.items():
+            connection.register(name, path)
+        connection.lock()
+    except BaseException:
+        connection.close()
+        raise
+    return connection
+
+
+# The first `rows` rows of a query's result as a DataFrame, whether more rows follow, and
+# the seconds taken; the rest of the result is never computed past the batch being read
+def preview(connection, sql, rows=PREVIEW_ROWS):
+    started = time.perf_counter()
+    reader = connection.execute(sql, batch_rows=min(rows, BATCH_ROWS))
+    batches, count, truncated = [], 0, False
+    for batch in reader:
+        jobs.report(None, f"{count:,} rows read")
+        if count >= rows:
+            truncated = True
+            break
+        kept = batch.slice(0, rows - count)
+        batches.append(kept)
+        count += kept.num_rows
+        if kept.num_rows < batch.num_rows:
+            truncated = True
+            break
+    reader.close()
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return table.to_pandas(), truncated, time.perf_counter() - started
+
+
+# Stream a query's whole result into the dataset store as a new version
+def save_result(connection, sql, store, name, source=""):
+    reader = connection.execute(sql)
+
+    def batches():
+        rows = 0
+        for batch in reader:
+            rows += batch.num_rows
+            jobs.report(None, f"{rows:,} rows saved")
+            yield batch
+
+    return store.save_batches(name, reader.schema, batches(), kind="query", source=source)
@@ -0,0 +1,199 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import instrument
+
+
+# Review database file (override with ANALYSIS_REVIEWS_DB)
+DB_PATH = os.environ.get("ANALYSIS_REVIEWS_DB", "reviews.db")
+# Connections shared by every session; readers never block each other in WAL mode
+POOL_SIZE = 4
+# Reviews shown per page
+PAGE_SIZE = 20
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT,
+        review TEXT
+    );
+    CREATE INDEX IF NOT EXISTS reviews_email_id ON reviews (email, id);
+"""
+
+# External-content full-text index over name and review, kept in sync by triggers
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+        name, review, content='reviews', content_rowid='id'
+    );
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_insert AFTER INSERT ON reviews BEGIN
+        INSERT INTO reviews_fts (rowid, name, review) VALUES (new.id, new.name, new.review);
+    END;
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_delete AFTER DELETE ON reviews BEGIN
+        INSERT INTO reviews_fts (reviews_fts, rowid, name, review) VALUES ('delete', old.id, old.name, old.review);
+    END;
+    CREATE TRIGGER IF NOT EXISTS reviews_fts_update AFTER UPDATE ON reviews BEGIN
+        INSERT INTO reviews_fts (reviews_fts, rowid, name, review) VALUES ('delete', old.id, old.name, old.review);
+        INSERT INTO reviews_fts (rowid, name, review) VALUES (new.id, new.name, new.review);
+    END;
+"""
+
+
+# Fixed-size pool of SQLite connections opened lazily in WAL mode. Connections run in
+# autocommit mode; writes go through transaction(), which takes the write lock up front.
+class ConnectionPool:
+    def __init__(self, path=DB_PATH, size=POOL_SIZE, busy_timeout_ms=5000):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                # A connection that fails to open gives its slot back, so failures (a locked
+                # or missing database) never leave later callers waiting for a free slot
+                try:
+                    conn = self._open()
+                except BaseException:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Quote every word of a search so FTS5 treats it as text, with prefix matching
+def _match_expression(text):
+    words = text.split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+# Review storage: schema set up once per database, keyset-paginated reads newest first,
+# single-transaction bulk deletes and full-text search (LIKE fallback without FTS5)
+class ReviewRepository:
+    def __init__(self, pool):
+        self.pool = pool
+        # Every statement is idempotent, so processes starting together can all run it
+        with pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            try:
+                fts_exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'reviews_fts'"
+                ).fetchone() is not None
+                conn.executescript(FTS_SCHEMA)
+                if not fts_exists:
+                    # Index the reviews written before full-text search existed
+                    conn.execute("INSERT INTO reviews_fts (reviews_fts) VALUES ('rebuild')")
+                self.full_text = True
+            except sqlite3.OperationalError:  # SQLite built without FTS5
+                self.full_text = False
+
+    def add(self, name, email, review):
+        with instrument.span("reviews.add"), self.pool.transaction() as conn:
+            cursor = conn.execute("INSERT INTO reviews (name, email, review) VALUES (?, ?, ?)", (name, email, review))
+            return cursor.lastrowid
+
+    # Reviews older than before_id (the newest first when None), optionally only those from
+    # one email address or matching a search. Returns the rows and whether more follow.
+    def page(self, before_id=None, limit=PAGE_SIZE, email=None, search=""):
+        conditions, params = [], []
+        source, order_key = "reviews", "reviews.id"
+        if search.strip():
+            if self.full_text:
+                # Walk the full-text index in rowid order so a page stops after `limit` matches
+                source, order_key = "reviews_fts JOIN reviews ON reviews.id = reviews_fts.rowid", "reviews_fts.rowid"
+                conditions.append("reviews_fts MATCH ?")
+                params.append(_match_expression(search))
+            else:
+                conditions.append("(reviews.name LIKE ? OR reviews.review LIKE ?)")
+                params += [f"%{search.strip()}%"] * 2
+        if email:
+            conditions.append("reviews.email = ?")
+            params.append(email)
+        if before_id is not None:
+            conditions.append(f"{order_key} < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            f"SELECT reviews.id, reviews.name, reviews.email, reviews.review FROM {source} {where} "
+            f"ORDER BY {order_key} DESC LIMIT ?"
+        )
+        with instrument.span("reviews.page", search=bool(search.strip()), email=bool(email)) as span:
+            with self.pool.connection() as conn:
+                rows = conn.execute(sql, params + [limit + 1]).fetchall()
+            span.set(rows=min(len(rows), limit))
+        return rows[:limit], len(rows) > limit
+
+    def count(self):
+        with instrument.span("reviews.count"), self.pool.connection() as conn:
+            return conn.execute("SELECT count(*) FROM reviews").fetchone()[0]
+
+    # Delete many reviews in one transaction; returns how many were removed
+    def delete_many(self, ids):
+        ids = [(int(review_id),) for review_id in ids]
+        if not ids:
+            return 0
+        with instrument.span("reviews.delete_many") as span, self.pool.transaction() as conn:
+            deleted = conn.executemany("DELETE FROM reviews WHERE id = ?", ids).rowcount
+            span.set(rows=deleted)
+            return deleted
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+# Repository shared by every session, created (and its schema set up) on first use
+def get_repository():
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            _repository = ReviewRepository(ConnectionPool())
+        return _repository
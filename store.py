@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import ingest
+
+
+# Where saved dataset versions live (override with ANALYSIS_STORE_DIR)
+STORE_DIR = os.environ.get("ANALYSIS_STORE_DIR", os.path.join(tempfile.gettempdir(), "analysis-tool-store"))
+# Disk budget for saved versions (override with ANALYSIS_STORE_MB)
+STORE_BYTES = int(os.environ.get("ANALYSIS_STORE_MB", "2048")) * 1024 * 1024
+
+
+# Named dataset versions kept as uncompressed Arrow IPC (Feather v2) files on local disk.
+# Files are memory-mapped when opened, so numeric columns without missing values reach pandas
+# without being copied and every section opens a version without parsing it again.
+# The least recently used versions are deleted once the files exceed max_bytes.
+class DatasetStore:
+    def __init__(self, root=STORE_DIR, max_bytes=STORE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        self._entries = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Drop entries whose file was removed behind our back
+        return {name: entry for name, entry in entries.items() if os.path.exists(self._path(entry))}
+
+    def _write_index(self):
+        temp_path = self._index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(temp_path, self._index_path)
+
+    def _path(self, entry):
+        return os.path.join(self.root, entry["file"])
+
+    def _new_entry(self, name, kind, source):
+        created = time.time()
+        fingerprint = hashlib.blake2b(f"{name}|{created}".encode(), digest_size=16).hexdigest()
+        return {
+            "name": name,
+            "kind": kind,
+            "source": source,
+            "file": f"{fingerprint}.arrow",
+            "fingerprint": fingerprint,
+            "created": created,
+            "last_used": created,
+        }
+
+    # Save df under `name`, replacing an earlier version with the same name.
+    # kind and source are free-form labels shown when listing versions.
+    def save(self, name, df, kind="", source=""):
+        entry = self._new_entry(name, kind, source)
+        entry["rows"], entry["columns"] = len(df), df.shape[1]
+        table = pa.Table.from_pandas(ingest.densify(df), preserve_index=False)
+        # One record batch per file, so each column is a single contiguous buffer on disk
+        feather.write_feather(table, self._path(entry), compression="uncompressed", chunksize=max(len(df), 1))
+        return self._add(entry)
+
+    # Save a stream of Arrow record batches (e.g. a query result) without holding it in memory.
+    # Versions saved this way are stored one batch at a time, so opening them copies each
+    # column into one buffer instead of mapping it.
+    def save_batches(self, name, schema, batches, kind="", source=""):
+        entry = self._new_entry(name, kind, source)
+        rows = 0
+        try:
+            with pa.ipc.new_file(self._path(entry), schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+                    rows += batch.num_rows
+        except BaseException:
+            self._remove_file(entry)
+            raise
+        entry["rows"], entry["columns"] = rows, len(schema)
+        return self._add(entry)
+
+    def _add(self, entry):
+        name = entry["name"]
+        entry["bytes"] = os.path.getsize(self._path(entry))
+        with self._lock:
+            previous = self._entries.pop(name, None)
+            self._entries[name] = entry
+            if previous is not None:
+                self._remove_file(previous)
+            self._evict(keep=name)
+            self._write_index()
+        return entry
+
+    # Open a saved version; returns the DataFrame and a fingerprint identifying this version.
+    # Columns mapped straight from the file are read-only: transform them into new columns
+    # (as every cleaning step does) rather than assigning into them in place.
+    def open(self, name, cache=None):
+        cache = ingest.default_cache if cache is None else cache
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise KeyError(f"No saved dataset named '{name}'.")
+            # Recency is persisted with the next save or delete, not on every open
+            entry["last_used"] = time.time()
+
+        df = cache.get(entry["fingerprint"])
+        if df is None:
+            table = feather.read_table(self._path(entry), memory_map=True)
+            df = table.to_pandas(split_blocks=True)
+            cache.put(entry["fingerprint"], df)
+        return df.copy(deep=False), entry["fingerprint"]
+
+    # File holding a saved version, for readers that scan it directly (e.g. the query engine)
+    def file_path(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise KeyError(f"No saved dataset named '{name}'.")
+            entry["last_used"] = time.time()
+            return self._path(entry)
+
+    def delete(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._remove_file(entry)
+                self._write_index()
+
+    # Saved versions, newest first
+    def versions(self):
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda entry: entry["created"], reverse=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "versions": len(self._entries),
+                "bytes": sum(entry["bytes"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove_file(self, entry):
+        try:
+            os.remove(self._path(entry))
+        except OSError:
+            pass
+
+    # Delete least recently used versions until the store fits its budget; the version
+    # just saved is always kept, even when it alone exceeds the budget
+    def _evict(self, keep):
+        total = sum(entry["bytes"] for entry in self._entries.values())
+        for entry in sorted(self._entries.values(), key=lambda entry: entry["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if entry["name"] == keep:
+                continue
+            del self._entries[entry["name"]]
+            self._remove_file(entry)
+            total -= entry["bytes"]
+
+
+# Store shared by every session of the app
+default_store = DatasetStore()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dedup
+
+
+def _frame(rows=1_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "zero": rng.choice([0.0, -0.0, np.nan, 1.5], rows),
+        "code": rng.integers(0, 3, rows),
+        "text": rng.choice(["Alpha", " alpha", "ALPHA  ", "beta", None], rows),
+    })
+
+
+def test_signed_zeros_are_duplicates():
+    df = pd.DataFrame({"c": [0.0, -0.0, np.nan, np.nan]})
+    assert dedup.duplicated_mask(df).tolist() == df.duplicated().tolist() == [False, True, False, True]
+
+
+@pytest.mark.parametrize("subset", [None, ["zero"], ["zero", "code"], ["text"]])
+def test_duplicated_mask_matches_pandas(subset):
+    df = _frame()
+    assert np.array_equal(dedup.duplicated_mask(df, subset), df.duplicated(subset).to_numpy())
+    assert dedup.count_duplicates(df, subset) == int(df.duplicated(subset).sum())
+
+
+def test_normalize_matches_pandas_on_normalized_text():
+    df = _frame()
+    normalized = df.assign(text=df["text"].str.strip().str.lower().str.replace(r"\s+", " ", regex=True))
+    assert np.array_equal(dedup.duplicated_mask(df, normalize=True), normalized.duplicated().to_numpy())
+
+
+@pytest.mark.parametrize("subset", [None, ["zero", "code"]])
+def test_deduplicator_matches_pandas_across_chunks(subset):
+    df = _frame()
+    deduplicator = dedup.Deduplicator(subset)
+    kept = pd.concat([deduplicator.filter(df.iloc[start:start + 128]) for start in range(0, len(df), 128)])
+    expected = df[~df.duplicated(subset)]
+    assert kept.index.tolist() == expected.index.tolist()
+    assert deduplicator.stats()["duplicates"] == len(df) - len(expected)
+
+
+def test_deduplicator_widens_integer_chunks_to_float_chunks():
+    deduplicator = dedup.Deduplicator()
+    deduplicator.filter(pd.DataFrame({"a": [1, 2]}))
+    kept = deduplicator.filter(pd.DataFrame({"a": [1.0, -0.0, 0.0, np.nan]}))
+    # 1.0 repeats the earlier integer 1, and 0.0 repeats -0.0
+    assert len(kept) == 2
+    assert kept["a"].iloc[0] == 0.0 and np.isnan(kept["a"].iloc[1])
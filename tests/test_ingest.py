@@ -0,0 +1,44 @@
+import io
+
+import pandas as pd
+
+import dedup
+import ingest
+
+
+# A code column that looks like text in the first chunk and like integers in the next
+def _mixed_csv():
+    rows = [f"A{i},{i},{i / 2}" for i in range(5)] + [f"7,{i}," for i in range(7)] + ["8,,1.5"]
+    return ("code,n,x\n" + "\n".join(rows) + "\n").encode()
+
+
+def test_optimized_loader_pins_sampled_types_across_chunks():
+    data = _mixed_csv()
+    plain = pd.read_csv(io.BytesIO(data))
+    df, _ = ingest.read_csv_optimized(data, chunksize=5, sample_rows=5)
+
+    assert df["code"].tolist() == plain["code"].tolist()
+    assert (df["code"] == "7").sum() == (plain["code"] == "7").sum() == 7
+    assert df["n"].isna().sum() == 1
+    assert df["n"].dropna().tolist() == plain["n"].dropna().astype(int).tolist()
+
+
+def test_optimized_loader_keeps_plain_integers_without_missing_values():
+    data = ("a,b\n" + "".join(f"{i},{i % 3}\n" for i in range(20))).encode()
+    df, _ = ingest.read_csv_optimized(data, chunksize=4, sample_rows=4)
+    assert not pd.api.types.is_extension_array_dtype(df["a"])
+    assert df["a"].tolist() == list(range(20))
+
+
+def test_optimized_loader_falls_back_when_a_chunk_contradicts_the_sample():
+    data = ("a\n" + "1\n" * 5 + "x\n").encode()
+    df, _ = ingest.read_csv_optimized(data, chunksize=3, sample_rows=3)
+    assert df["a"].tolist() == pd.read_csv(io.BytesIO(data))["a"].tolist()
+
+
+def test_deduplicator_finds_duplicates_across_optimized_chunks():
+    data = _mixed_csv() + b"7,0,\n"
+    df, _ = ingest.read_csv_optimized(data, chunksize=5, sample_rows=5)
+    deduplicator = dedup.Deduplicator()
+    kept = pd.concat([deduplicator.filter(df.iloc[start:start + 5]) for start in range(0, len(df), 5)])
+    assert len(kept) == (~pd.read_csv(io.BytesIO(data)).duplicated()).sum()
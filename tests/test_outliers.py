@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import outliers
+
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+DISTRIBUTIONS = {
+    "uniform": lambda rng, n: rng.uniform(0, 1, n),
+    "normal": lambda rng, n: rng.normal(100, 15, n),
+    "lognormal": lambda rng, n: rng.lognormal(0, 2, n),
+    "heavy_ties": lambda rng, n: rng.integers(0, 20, n).astype(float),
+    "sorted": lambda rng, n: np.arange(n, dtype=float),
+}
+
+
+# Distance between q and the range of normalized ranks the estimate holds in the exact data
+def _rank_errors(data, estimates, quantiles):
+    data = np.sort(data)
+    below = np.searchsorted(data, estimates, side="left") / len(data)
+    at_or_below = np.searchsorted(data, estimates, side="right") / len(data)
+    return np.maximum(below - quantiles, 0) + np.maximum(quantiles - at_or_below, 0)
+
+
+@pytest.mark.parametrize("name", DISTRIBUTIONS)
+def test_sketch_quantiles_within_rank_error(name):
+    rng = np.random.default_rng(1)
+    data = DISTRIBUTIONS[name](rng, 200_000)
+    sketch = outliers.KLLSketch(k=200, seed=2)
+    for chunk in np.array_split(data, 37):
+        sketch.update(chunk)
+
+    assert sketch.count == len(data)
+    errors = _rank_errors(data, sketch.quantile(QUANTILES), QUANTILES)
+    assert errors.max() <= sketch.rank_error()
+    assert sketch.quantile(0.0) == data.min()
+    assert sketch.quantile(1.0) == data.max()
+
+
+@pytest.mark.parametrize("name", DISTRIBUTIONS)
+def test_merged_sketches_within_rank_error(name):
+    rng = np.random.default_rng(3)
+    data = DISTRIBUTIONS[name](rng, 200_000)
+    sketches = [outliers.KLLSketch(k=200, seed=seed).update(part) for seed, part in enumerate(np.array_split(data, 8))]
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged.merge(sketch)
+
+    assert merged.count == len(data)
+    errors = _rank_errors(data, merged.quantile(QUANTILES), QUANTILES)
+    assert errors.max() <= merged.rank_error()
+
+
+def test_sketch_matches_exact_quantiles_while_small():
+    data = np.random.default_rng(4).normal(size=150)
+    sketch = outliers.KLLSketch(k=200).update(data)
+    assert np.array_equal(sketch.quantile(QUANTILES), np.quantile(data, QUANTILES, method="inverted_cdf"))
+
+
+def test_sketch_ignores_nan_and_handles_empty():
+    sketch = outliers.KLLSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.update([np.nan, 1.0, np.nan, 3.0])
+    assert sketch.count == 2
+    assert sketch.quantile(0.0) == 1.0 and sketch.quantile(1.0) == 3.0
+
+
+def test_streaming_bounds_match_in_memory_bounds():
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({"a": rng.normal(50, 10, 100_000), "b": rng.exponential(3, 100_000)})
+    df.loc[rng.random(len(df)) < 0.05, "a"] = np.nan
+    halves = [outliers.StreamingBounds(k=200).update(part) for part in (df.iloc[:40_000], df.iloc[40_000:])]
+    stream = halves[0].merge(halves[1])
+
+    exact = outliers.column_bounds(df, method="zscore")
+    streamed = stream.bounds("zscore")
+    np.testing.assert_allclose(streamed.loc[exact.index].to_numpy(), exact.to_numpy())
+
+    # IQR bounds come from sketched quartiles, which must hold their rank error
+    for col in df.columns:
+        values = df[col].dropna().to_numpy()
+        sketch = stream.sketches[col]
+        quartiles = np.array([0.25, 0.75])
+        assert _rank_errors(values, sketch.quantile(quartiles), quartiles).max() <= sketch.rank_error()
+
+    with pytest.raises(ValueError):
+        stream.bounds("mad")
+
+
+def test_filter_csv_streams_rows_within_sketched_bounds(tmp_path):
+    rng = np.random.default_rng(6)
+    df = pd.DataFrame({"a": rng.normal(0, 1, 20_000), "label": rng.choice(["x", "y"], 20_000)})
+    df.loc[:9, "a"] = 1_000.0
+    source, output = tmp_path / "in.csv", tmp_path / "out.csv"
+    df.to_csv(source, index=False)
+
+    bounds = outliers.bounds_from_csv(source, ["a"], chunksize=3_000)
+    stats = outliers.filter_csv(source, output, bounds, chunksize=3_000)
+    written = pd.read_csv(output)
+
+    assert stats["rows"] == len(df)
+    assert stats["written"] == len(written) == len(df) - stats["removed"]
+    assert list(written.columns) == ["a", "label"]
+    assert written["a"].max() < 1_000.0
+    exact = outliers.column_bounds(df, ["a"])
+    assert abs(stats["removed"] - outliers.outlier_mask(df, exact).sum()) <= 0.01 * len(df)
+
+
+def test_command_line_prints_bounds(tmp_path, capsys):
+    source = tmp_path / "in.csv"
+    pd.DataFrame({"a": np.arange(1_000.0)}).to_csv(source, index=False)
+    assert outliers.main([str(source), str(tmp_path / "out.csv"), "--method", "zscore"]) == 0
+    assert "0 outliers removed, 1000 written" in capsys.readouterr().out